@@ -0,0 +1,77 @@
+import re
+import uuid
+import random
+import asyncio
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+PRODUCT_WORDS = ("shirt", "t-shirt", "jeans", "denim", "jacket", "dress", "trousers", "sneaker", "belt", "leather")
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for Gemini that drives the real agent graph.
+
+    "buy <product>" calls buy_product, messages mentioning a product word
+    call search_inventory (with max_price for "under $N"), and a tool
+    result is answered with a short summary of it. Everything else gets a
+    canned greeting. `latency` simulates the provider round trip and
+    `fail_rate` the share of calls that fail like a throttled provider;
+    calls slower than `timeout` fail like a provider request timeout.
+    """
+
+    latency: float = 0.0
+    fail_rate: float = 0.0
+    timeout: float = 0.0
+    email: str = "bench@example.com"
+
+    @property
+    def _llm_type(self):
+        return "scripted-bench"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages):
+        last = messages[-1]
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Here is what I found:\n{str(last.content)[:300]}")
+
+        text = last.content.lower() if isinstance(last, HumanMessage) and isinstance(last.content, str) else ""
+        if text.startswith("buy "):
+            return self._tool_call("buy_product", {"product_name": text[4:].strip(), "quantity": 1, "user_email": self.email})
+
+        words = [word for word in PRODUCT_WORDS if word in text]
+        if words:
+            args = {"query": words[0]}
+            price = re.search(r"under \$?(\d+)", text)
+            if price:
+                args["max_price"] = float(price.group(1))
+            return self._tool_call("search_inventory", args)
+
+        return AIMessage(content="Hello! I can help you find products from our store.")
+
+    def _tool_call(self, name, args):
+        return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}", "type": "tool_call"}])
+
+    def _with_usage(self, messages, message):
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": len(str(message.content)) // 4,
+            "total_tokens": input_tokens + len(str(message.content)) // 4,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        return self._with_usage(messages, self._respond(messages))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.timeout and self.latency > self.timeout:
+            await asyncio.sleep(self.timeout)
+            raise TimeoutError("Deadline exceeded (simulated)")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise RuntimeError("429 Resource exhausted (simulated)")
+        return self._with_usage(messages, self._respond(messages))
@@ -0,0 +1,75 @@
+import time
+import itertools
+from types import SimpleNamespace
+
+class FakeMessage:
+    """Records replies and edits instead of calling the Bot API."""
+
+    def __init__(self, chat_id, text, message_id=0):
+        self.chat_id = chat_id
+        self.text = text
+        self.message_id = message_id
+        self.replies = []
+        self.first_reply_at = None
+
+    async def reply_text(self, text, parse_mode=None, **kwargs):
+        if self.first_reply_at is None:
+            self.first_reply_at = time.perf_counter()
+        sent = FakeMessage(self.chat_id, text, self.message_id + len(self.replies) + 1)
+        self.replies.append(sent)
+        return sent
+
+    async def edit_text(self, text, parse_mode=None, **kwargs):
+        self.text = text
+        return self
+
+class StubBot:
+    """
+    Records send_photo/send_media_group calls like the Bot API would answer
+    them: strings that are not URLs count as file_id reuse, anything else
+    as an upload that gets a new file_id.
+    """
+
+    def __init__(self):
+        self.uploads = 0
+        self.reused = 0
+        self.calls = 0
+        self._ids = itertools.count(1)
+
+    def _photo(self, media):
+        if isinstance(media, str) and not media.startswith(("http://", "https://")):
+            self.reused += 1
+            file_id = media
+        else:
+            self.uploads += 1
+            file_id = f"stub-file-{next(self._ids)}"
+        return SimpleNamespace(photo=[SimpleNamespace(file_id=file_id)])
+
+    async def send_photo(self, chat_id, photo, caption=None, **kwargs):
+        self.calls += 1
+        return self._photo(photo)
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        self.calls += 1
+        return tuple(self._photo(item.media) for item in media)
+
+    def stats(self):
+        return {"calls": self.calls, "uploads": self.uploads, "reused": self.reused}
+
+def fake_update(chat_id, text, update_id=0):
+    message = FakeMessage(chat_id, text, update_id)
+    return SimpleNamespace(
+        update_id=update_id,
+        message=message,
+        effective_message=message,
+        effective_chat=SimpleNamespace(id=chat_id, type="private"),
+        effective_user=SimpleNamespace(id=chat_id, first_name=f"Bench{chat_id}"),
+    )
+
+def fake_context(args=None, bot=None):
+    return SimpleNamespace(args=args or [], bot=bot)
+
+def conversation(chat_id, script, start_update_id=0):
+    """Yields one fake update per scripted message for a chat."""
+    for i, text in enumerate(script):
+        yield fake_update(chat_id, text, start_update_id + i)
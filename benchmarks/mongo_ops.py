@@ -0,0 +1,30 @@
+import threading
+from collections import Counter
+from pymongo import monitoring
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts Mongo commands by name for every client created after registration."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def started(self, event):
+        with self._lock:
+            self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.counts)
+
+command_counter = CommandCounter()
+
+def install():
+    monitoring.register(command_counter)
+    return command_counter
@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+SCRIPT = ["hi", "show me shirts", "any jackets under $200?", "buy Leather Belt", "thanks"]
+
+def configure(args):
+    """Points the app at an offline setup before anything imports config.db."""
+    os.environ["MONGODB_DB"] = args.db
+    os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:offline-benchmark")
+    os.environ["STREAM_REPLIES"] = "true" if args.stream else "false"
+    os.environ["EMAIL_WORKERS"] = "0"
+    if args.deadline:
+        os.environ["ADMISSION_DEADLINE_SECONDS"] = str(args.deadline)
+    os.environ.pop("SMTP_SERVER", None)
+    if args.backend == "mongomock":
+        os.environ["MONGODB_BACKEND"] = "mongomock"
+        # mongomock has no $text support.
+        os.environ["INVENTORY_SEARCH_MODE"] = "regex"
+    else:
+        os.environ.setdefault("MONGODB_URL", "mongodb://localhost:27017/")
+
+def percentiles(latencies):
+    ordered = sorted(latencies)
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+    return statistics.median(ordered) * 1000, pick(0.95), pick(0.99)
+
+class Scenario:
+    def __init__(self, name, counter):
+        self.name = name
+        self.counter = counter
+        self.latencies = []
+
+    async def __aenter__(self):
+        self.ops_before = self.counter.snapshot() if self.counter else None
+        self.started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        p50, p95, p99 = percentiles(self.latencies) if self.latencies else (0, 0, 0)
+        line = (
+            f"{self.name:<16} n={len(self.latencies):<5} {len(self.latencies) / elapsed:>8.1f} ops/s  "
+            f"p50 {p50:>7.1f}ms  p95 {p95:>7.1f}ms  p99 {p99:>7.1f}ms"
+        )
+        if self.counter:
+            ops = self.counter.snapshot() - self.ops_before
+            per_op = sum(ops.values()) / max(1, len(self.latencies))
+            top = ", ".join(f"{name}={count}" for name, count in ops.most_common(4))
+            line += f"  mongo {sum(ops.values())} cmds ({per_op:.1f}/op: {top})"
+        else:
+            line += "  mongo n/a"
+        print(line)
+
+    async def timed(self, coroutine):
+        start = time.perf_counter()
+        result = await coroutine
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+async def run(args, counter):
+    import main
+    from langchain.agents import create_agent
+    from config.db import client, db
+    from core.container import services
+    from scripts.seed_inventory import seed_inventory
+    from tools.inventory_tools import search_inventory
+    from tools.order_tools import buy_product
+    from benchmarks.fake_llm import ScriptedChatModel
+    from benchmarks.fake_telegram import StubBot, conversation, fake_context
+
+    model = ScriptedChatModel(latency=args.llm_latency, fail_rate=args.llm_fail_rate, timeout=services.admission.deadline)
+    services.override(
+        model=model,
+        agent=create_agent(model=model, tools=[search_inventory, buy_product], system_prompt="Benchmark agent."),
+    )
+
+    seed_inventory(build_indexes=args.backend != "mongomock")
+    db["inventory"].update_many({}, {"$set": {"stock": 10 ** 9}})
+    if args.backend != "mongomock":
+        await main.on_startup(None)
+
+    try:
+        async with Scenario("search_inventory", counter) as scenario:
+            queries = [{"query": q} for q in ("shirt", "jacket", "dress", "belt")] + [{"category": "Men", "max_price": 100}]
+            await asyncio.gather(*(
+                scenario.timed(search_inventory.ainvoke(queries[i % len(queries)])) for i in range(args.chats * 4)
+            ))
+        print(f"{'':<16} search cache: {services.search_cache.stats()}")
+
+        async with Scenario("buy_product", counter) as scenario:
+            await asyncio.gather(*(
+                scenario.timed(buy_product.ainvoke({"product_name": "Leather Belt", "quantity": 1, "user_email": "bench@example.com"}))
+                for _ in range(args.chats)
+            ))
+
+        async def chat_turns(scenario, chat_id):
+            for text in SCRIPT[:args.messages]:
+                await scenario.timed(main.process_chat(f"bench-{chat_id}", text))
+
+        async with Scenario("process_chat", counter) as scenario:
+            await asyncio.gather(*(chat_turns(scenario, c) for c in range(args.chats)))
+        print(f"{'':<16} admission: {services.admission.stats()}")
+
+        bot = StubBot()
+
+        async def handler_turns(scenario, chat_id):
+            for update in conversation(10 ** 6 + chat_id, SCRIPT[:args.messages]):
+                await scenario.timed(main.handle_message(update, fake_context(bot=bot)))
+
+        async with Scenario("handle_message", counter) as scenario:
+            await asyncio.gather(*(handler_turns(scenario, c) for c in range(args.chats)))
+        print(f"{'':<16} admission: {services.admission.stats()}")
+        print(f"{'':<16} product photos: {bot.stats()}")
+    finally:
+        if not args.keep:
+            client.drop_database(args.db)
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load test with a scripted LLM and fake Telegram updates.")
+    parser.add_argument("--chats", type=int, default=20, help="concurrent chats")
+    parser.add_argument("--messages", type=int, default=len(SCRIPT), help="messages per chat (max %d)" % len(SCRIPT))
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds per LLM call")
+    parser.add_argument("--llm-fail-rate", type=float, default=0.0, help="share of LLM calls that raise, to exercise the circuit breaker")
+    parser.add_argument("--deadline", type=float, default=0.0, help="override ADMISSION_DEADLINE_SECONDS, e.g. below --llm-latency")
+    parser.add_argument("--backend", choices=("mongod", "mongomock"), default="mongod")
+    parser.add_argument("--db", default="salesmate_bench", help="scratch database, dropped afterwards")
+    parser.add_argument("--stream", action="store_true", help="benchmark the streaming reply path")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+
+    configure(args)
+    counter = None
+    if args.backend == "mongod":
+        from benchmarks.mongo_ops import install
+        counter = install()
+
+    print(f"Backend {args.backend}, {args.chats} chats x {args.messages} messages, LLM latency {args.llm_latency}s")
+    asyncio.run(run(args, counter))
+
+if __name__ == "__main__":
+    main()
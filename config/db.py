@@ -1,8 +1,155 @@
 import os
+import asyncio
+import functools
+import threading
 import pymongo
+from pymongo import monitoring
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from core.metrics import registry, mongo_command_metrics
 
 load_dotenv()
 
-client = pymongo.MongoClient(os.getenv("MONGODB_URL"))
-db = client["salesmate"]
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool activity for the shared client."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connections_open = 0
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total = 0.0
+        self.pool_clears = 0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "connections_open": self.connections_open,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checked_out": self.checked_out,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_wait_ms": (self.checkout_wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                "pool_clears": self.pool_clears,
+            }
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.checkout_wait_total += getattr(event, "duration", 0.0) or 0.0
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+pool_metrics = PoolMetrics()
+registry.gauge_callback(
+    "salesmate_mongo_pool",
+    "Shared MongoClient connection pool statistics.",
+    lambda: {(("stat", name),): value for name, value in pool_metrics.snapshot().items()},
+)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Creates the shared client on first use, so importing a module that
+    needs the database costs nothing until a query is actually made.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if os.getenv("MONGODB_BACKEND") == "mongomock":
+                # In-memory stand-in for offline benchmarks (see "Benchmarks" in the README).
+                import mongomock
+                _client = mongomock.MongoClient()
+            else:
+                _client = pymongo.MongoClient(
+                    os.getenv("MONGODB_URL"),
+                    maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+                    minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+                    maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000)),
+                    connectTimeoutMS=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000)),
+                    serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+                    socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000)),
+                    waitQueueTimeoutMS=int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000)),
+                    event_listeners=[pool_metrics, mongo_command_metrics],
+                )
+        return _client
+
+class LazyDatabase:
+    """Stands in for the configured Database and connects on first access."""
+
+    def __init__(self, name):
+        self.name = name
+        self._database = None
+
+    def _get(self):
+        if self._database is None:
+            self._database = get_client()[self.name]
+        return self._database
+
+    def __getitem__(self, collection_name):
+        return self._get()[collection_name]
+
+    def __getattr__(self, attribute):
+        return getattr(self._get(), attribute)
+
+db = LazyDatabase(os.getenv("MONGODB_DB", "salesmate"))
+
+def __getattr__(name):
+    # `from config.db import client` keeps working without connecting at import.
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# PyMongo is blocking; async code hands its calls to this pool so a slow
+# query never stalls the event loop. Sized to roughly match the driver's
+# connection pool so threads do not queue on connections.
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_EXECUTOR_WORKERS", 32)),
+    thread_name_prefix="mongo",
+)
+
+async def run_db(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
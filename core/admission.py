@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import asyncio
+import threading
+import contextvars
+from cachetools import TTLCache
+from langchain_core.callbacks import BaseCallbackHandler
+from core.metrics import log_event, registry
+
+admission_rejections = registry.counter("salesmate_admission_rejections_total", "Agent runs refused or abandoned by admission control.")
+
+# Model errors seen during the current admitted run; shared with the tasks the run spawns.
+_model_errors = contextvars.ContextVar("model_errors", default=None)
+
+class ModelErrorTracker(BaseCallbackHandler):
+    """
+    Reports chat model failures to admission control. Pass it in the
+    callbacks of any model call made under `AdmissionController.run`;
+    only failures it sees (timeouts included) count toward the circuit
+    breaker, so database or tool errors cannot open it.
+    """
+
+    run_inline = True
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        errors = _model_errors.get()
+        if errors is not None:
+            errors.append(error)
+
+class Rejected(Exception):
+    """
+    Raised instead of running the agent, or when the run failed. `reason`
+    is one of rate_limited, circuit_open, overloaded or error.
+    """
+
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive model failures or timeouts and
+    refuses calls for `reset_timeout` seconds. Then a single probe is let
+    through: success closes the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=None, reset_timeout=None):
+        self.failure_threshold = failure_threshold or int(os.getenv("ADMISSION_BREAKER_FAILURES", 5))
+        self.reset_timeout = reset_timeout or float(os.getenv("ADMISSION_BREAKER_RESET_SECONDS", 30))
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+
+    def allow(self):
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            return True
+        # Open, or half-open with the probe still in flight.
+        return False
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def abandon_probe(self):
+        """The probe ended without telling us anything about the provider; let the next call probe again."""
+        if self.state == "half_open":
+            self.state = "open"
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                log_event("circuit_open", failures=self.failures)
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+class AdmissionController:
+    """
+    Decides whether a chat message may run the agent (and so call Gemini).
+
+    Each chat has a token bucket (`chat_rate` messages per minute, bursts of
+    `chat_burst`), at most `max_in_flight` agent runs execute at once and a
+    run waits at most `queue_timeout` seconds for a slot, and a circuit
+    breaker stops calling the provider while it keeps failing. `deadline`
+    bounds each model call, not the run: the model is built with it as its
+    request timeout, so tools that already started (an order being placed)
+    are never cut off. Whenever a run is refused or fails, `Rejected` is
+    raised and the caller answers without the LLM.
+    """
+
+    def __init__(self, max_in_flight=None, queue_timeout=None, deadline=None, chat_rate=None, chat_burst=None, breaker=None):
+        self.max_in_flight = max_in_flight or int(os.getenv("ADMISSION_MAX_IN_FLIGHT", 16))
+        self.queue_timeout = queue_timeout or float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", 5))
+        self.deadline = deadline or float(os.getenv("ADMISSION_DEADLINE_SECONDS", 30))
+        self.chat_rate = (chat_rate or float(os.getenv("ADMISSION_CHAT_RATE_PER_MINUTE", 20))) / 60
+        self.chat_burst = chat_burst or int(os.getenv("ADMISSION_CHAT_BURST", 5))
+        self.breaker = breaker or CircuitBreaker()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = {}
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        # Idle buckets are full again after capacity / rate seconds, so they can simply expire.
+        self._buckets = TTLCache(maxsize=int(os.getenv("ADMISSION_MAX_CHATS", 10000)), ttl=self.chat_burst / self.chat_rate)
+        self._lock = threading.Lock()
+        registry.gauge_callback("salesmate_agent_in_flight", "Agent runs currently executing.", lambda: {None: self.in_flight})
+        registry.gauge_callback(
+            "salesmate_circuit_open", "1 while the LLM circuit breaker refuses calls.",
+            lambda: {None: int(self.breaker.state != "closed")},
+        )
+
+    def _reject(self, reason):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        admission_rejections.inc(reason=reason)
+        log_event("admission_rejected", reason=reason)
+        return Rejected(reason)
+
+    def _take_token(self, chat_id):
+        with self._lock:
+            bucket = self._buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            return bucket.take()
+
+    async def run(self, chat_id, make_call):
+        """
+        Runs `make_call()` (a coroutine factory) under admission control.
+
+        Raises:
+            Rejected: If the run was refused, timed out or failed.
+        """
+        if chat_id is not None and not self._take_token(chat_id):
+            raise self._reject("rate_limited")
+        if not self.breaker.allow():
+            raise self._reject("circuit_open")
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.breaker.abandon_probe()
+            raise self._reject("overloaded")
+
+        self.in_flight += 1
+        self.admitted += 1
+        model_errors = []
+        token = _model_errors.set(model_errors)
+        try:
+            result = await make_call()
+        except asyncio.CancelledError:
+            # Don't leave the breaker half-open forever if the probe was cancelled.
+            self.breaker.abandon_probe()
+            raise
+        except Exception as e:
+            log_event("agent_error", error=repr(e), model_error=bool(model_errors))
+            if model_errors:
+                self.breaker.record_failure()
+            else:
+                # A database or tool failure says nothing about the provider.
+                self.breaker.abandon_probe()
+            raise self._reject("error") from e
+        finally:
+            _model_errors.reset(token)
+            self.in_flight -= 1
+            self._slots.release()
+        self.breaker.record_success()
+        return result
+
+    def stats(self):
+        return {"admitted": self.admitted, "rejected": dict(self.rejected), "in_flight": self.in_flight, "breaker": self.breaker.state}
+
+RATE_LIMITED_REPLY = "You're sending messages a little too fast. Please wait a moment and try again."
+DEGRADED_NOTICE = "I'm running in quick mode right now, so I can only look up products."
+CATEGORY_WORDS = {"men": "Men", "mens": "Men", "man": "Men", "women": "Women", "womens": "Women", "woman": "Women",
+                  "ladies": "Women", "kids": "Kids", "kid": "Kids", "children": "Kids", "accessories": "Accessories"}
+STOPWORDS = {
+    "a", "an", "the", "i", "me", "my", "we", "you", "your", "do", "does", "have", "has", "any", "some", "show",
+    "find", "get", "want", "need", "looking", "look", "for", "to", "in", "on", "of", "with", "and", "or", "is",
+    "are", "please", "can", "could", "would", "like", "what", "which", "there", "under", "below", "over", "above",
+    "less", "more", "than", "max", "min", "dollars", "cheap", "buy", "price", "prices", "much", "how", "hi", "hello", "thanks", "s",
+}
+
+def parse_search(text):
+    """
+    Turns a message like "any women's jackets under $100?" into
+    search_products arguments without the LLM. Returns None when the
+    message names no product.
+    """
+    lowered = text.lower()
+    max_price = re.search(r"(?:under|below|less than|max)\s*\$?\s*(\d+(?:\.\d+)?)", lowered)
+    min_price = re.search(r"(?:over|above|more than|min)\s*\$?\s*(\d+(?:\.\d+)?)", lowered)
+    category = None
+    keywords = []
+    for word in re.findall(r"[a-z][a-z\-]*", lowered.replace("'", "")):
+        if word in CATEGORY_WORDS:
+            category = category or CATEGORY_WORDS[word]
+        elif word not in STOPWORDS:
+            keywords.append(word)
+    if not keywords and not category:
+        return None
+    return {
+        "keywords": keywords,
+        "category": category,
+        "min_price": float(min_price.group(1)) if min_price else None,
+        "max_price": float(max_price.group(1)) if max_price else None,
+    }
+
+async def degraded_reply(inventory_service, text):
+    """
+    Answers a message straight from the inventory when the agent can't run.
+
+    Returns:
+        A tuple (reply, products) of the plain-text answer and the products it lists.
+    """
+    search = parse_search(text)
+    if search is None:
+        return f"{DEGRADED_NOTICE} Try asking for a product, e.g. \"men's jackets under $100\".", []
+
+    keywords = search["keywords"]
+    # The whole phrase first, then single words and their singulars, so "red summer dresses" still finds dresses.
+    singulars = [word[:-1] for word in keywords if word.endswith("s") and not word.endswith("ss")]
+    queries = list(dict.fromkeys([" ".join(keywords)] + keywords + singulars)) if keywords else [None]
+    products = []
+    for query in queries[:6]:
+        products = await inventory_service.search_products_async(query, search["category"], search["min_price"], search["max_price"], limit=5)
+        if products:
+            break
+
+    if not products:
+        return f"{DEGRADED_NOTICE} I couldn't find products matching that, please try other words.", []
+    lines = [f"- {product['name']}: ${product.get('price', 0):.2f}" + ("" if product.get("stock", 0) > 0 else " (out of stock)") for product in products]
+    return f"{DEGRADED_NOTICE} Here is what I found:\n" + "\n".join(lines), products
@@ -0,0 +1,147 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from cachetools import TTLCache
+from pymongo.errors import PyMongoError
+from config.db import db, run_db
+from core.metrics import registry
+
+SHARED_COLLECTION = "cache_entries"
+_caches = []
+
+def normalize(value):
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value.strip().lower())
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+class ResultCache:
+    """
+    Size-bounded LRU cache with a TTL, optionally backed by a shared
+    Mongo tier so several workers can reuse each other's results.
+
+    Keys are built from normalized arguments, so "Men " and "men" hit the
+    same entry. `clear()` drops both tiers and is wired to inventory
+    changes by the callers.
+    """
+
+    def __init__(self, namespace, maxsize=None, ttl=None, shared=None):
+        self.namespace = namespace
+        self.ttl = ttl or float(os.getenv("CACHE_TTL_SECONDS", 300))
+        self.local = TTLCache(maxsize=maxsize or int(os.getenv("CACHE_MAX_ENTRIES", 1024)), ttl=self.ttl)
+        if shared is None:
+            shared = os.getenv("CACHE_SHARED_TIER", "false").lower() in ("1", "true", "yes")
+        self.shared_collection = db[SHARED_COLLECTION] if shared else None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    @staticmethod
+    def make_key(*args, **kwargs):
+        payload = json.dumps(
+            [[normalize(a) for a in args], {k: normalize(v) for k, v in kwargs.items()}],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(payload.encode()).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value = self.local.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+
+        if self.shared_collection is not None:
+            try:
+                doc = self.shared_collection.find_one(
+                    {"namespace": self.namespace, "key": key, "expires_at": {"$gt": datetime.utcnow()}},
+                    {"value": 1},
+                )
+            except PyMongoError:
+                doc = None
+            if doc:
+                with self._lock:
+                    self.shared_hits += 1
+                    self.local[key] = doc["value"]
+                return doc["value"]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        with self._lock:
+            self.local[key] = value
+        if self.shared_collection is not None:
+            try:
+                self.shared_collection.update_one(
+                    {"namespace": self.namespace, "key": key},
+                    {"$set": {"value": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl)}},
+                    upsert=True,
+                )
+            except PyMongoError as e:
+                print(f"Shared cache write failed for {self.namespace}: {e}")
+
+    async def aget(self, key):
+        with self._lock:
+            value = self.local.get(key)
+            if value is not None:
+                self.hits += 1
+                return value
+        if self.shared_collection is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return await run_db(self.get, key)
+
+    async def aset(self, key, value):
+        if self.shared_collection is None:
+            with self._lock:
+                self.local[key] = value
+            return
+        await run_db(self.set, key, value)
+
+    def clear(self, *_):
+        with self._lock:
+            self.local.clear()
+        if self.shared_collection is not None:
+            try:
+                self.shared_collection.delete_many({"namespace": self.namespace})
+            except PyMongoError as e:
+                print(f"Shared cache clear failed for {self.namespace}: {e}")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.shared_hits) / lookups if lookups else 0.0,
+                "size": len(self.local),
+            }
+
+def ensure_indexes():
+    collection = db[SHARED_COLLECTION]
+    collection.create_index([("namespace", 1), ("key", 1)], unique=True)
+    collection.create_index("expires_at", expireAfterSeconds=0)
+
+def cache_stats():
+    return {cache.namespace: cache.stats() for cache in _caches}
+
+registry.gauge_callback(
+    "salesmate_cache",
+    "Result cache hits, misses, hit rate and size.",
+    lambda: {
+        (("cache", namespace), ("stat", name)): value
+        for namespace, stats in cache_stats().items()
+        for name, value in stats.items()
+    },
+)
@@ -0,0 +1,158 @@
+import os
+from functools import cached_property
+
+SYSTEM_PROMPT = (
+    "You are a helpful sales assistant for SalesMate, a fashion brand.\n"
+    "You can check our inventory to answer user questions about products, prices, and availability.\n"
+    "If a user asks about products, use the 'search_inventory' tool to find relevant items.\n"
+    "BROWSING: For overview questions about which categories, sizes or price ranges we carry, call 'browse_catalog' once instead of searching repeatedly.\n"
+    "When displaying products, mention each product by its exact name; its photo is sent automatically after your reply, so never include image URLs.\n"
+    "Be polite and professional and don't return response in markdown format just plain text.\n"
+    "IMPORTANT: Remember context from the conversation. If the user mentions their size, preferences, or other details, use that information to answer follow-up questions.\n"
+    "SHOPPING: If a user wants to buy something, use the 'buy_product' tool. YOU MUST ask for their email address if it's not already known before confirming the purchase.\n"
+    "CART: If a user wants several products, add each one with 'add_to_cart' and then buy them together with a single 'checkout_cart' call instead of calling 'buy_product' repeatedly.\n"
+    "ORDERS: If a user asks about their past orders, use the 'get_order_history' tool; pass 'days' for questions like 'last week'."
+)
+
+class Services:
+    """
+    Builds the bot's services on first use instead of at import time.
+
+    Importing the bot no longer creates Mongo clients, service singletons
+    or the Gemini model, so workers boot quickly and scripts only pay for
+    what they touch. Heavy libraries (the Gemini client, the agent graph)
+    are imported inside their builders for the same reason.
+
+    Any service can be injected before first use, either as keyword
+    arguments to `override()` or by plain assignment, e.g. benchmarks
+    replace `model` and `agent` with scripted fakes.
+    """
+
+    def override(self, **services):
+        self.__dict__.update(services)
+        return self
+
+    @cached_property
+    def inventory_service(self):
+        from features.inventory.service import InventoryService
+        return InventoryService()
+
+    @cached_property
+    def order_service(self):
+        from features.orders.service import OrderService
+        return OrderService(self.inventory_service)
+
+    @cached_property
+    def cart_service(self):
+        from features.cart.service import CartService
+        return CartService(self.inventory_service)
+
+    @cached_property
+    def auth_service(self):
+        from features.users.service import AuthService
+        return AuthService()
+
+    @cached_property
+    def email_queue(self):
+        from features.notifications.service import EmailService
+        from features.notifications.queue import EmailQueue
+        return EmailQueue(EmailService())
+
+    @cached_property
+    def product_resolver(self):
+        from features.inventory.resolver import ProductResolver
+        from features.inventory.service import add_change_listener
+        resolver = ProductResolver(self.inventory_service.collection, self.inventory_service.cache)
+        add_change_listener(resolver.invalidate)
+        return resolver
+
+    @cached_property
+    def facet_index(self):
+        from features.inventory.facets import FacetIndex
+        from features.inventory.service import add_change_listener
+        index = FacetIndex(self.inventory_service.collection, self.inventory_service.cache)
+        add_change_listener(index.invalidate)
+        return index
+
+    @cached_property
+    def search_cache(self):
+        from core.cache import ResultCache
+        from features.inventory.service import add_change_listener
+        cache = ResultCache("search_inventory", ttl=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", 60)))
+        add_change_listener(cache.clear)
+        return cache
+
+    @cached_property
+    def response_cache(self):
+        # First-turn answers only depend on the question and the catalog, so they
+        # can be shared between users until the inventory changes.
+        if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        from core.cache import ResultCache
+        from features.inventory.service import add_change_listener
+        # Entries are {"text", "product_ids"}; the namespace changed with that format.
+        cache = ResultCache("first_turn_replies", ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 300)))
+        add_change_listener(cache.clear)
+        return cache
+
+    @cached_property
+    def sales_analytics(self):
+        from features.analytics.service import SalesAnalytics
+        return SalesAnalytics()
+
+    @cached_property
+    def photo_sender(self):
+        from core.media import ProductPhotoSender
+        return ProductPhotoSender(self.inventory_service)
+
+    @cached_property
+    def memory(self):
+        from features.memory.service import ConversationMemory
+        return ConversationMemory(summarizer=self.summarize_history)
+
+    @cached_property
+    def admission(self):
+        from core.admission import AdmissionController
+        return AdmissionController()
+
+    @cached_property
+    def model(self):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        return ChatGoogleGenerativeAI(
+            model="gemini-2.5-flash-lite",
+            api_key=os.getenv("GEMINI_API_KEY"),
+            # Model calls, not whole agent runs, are what admission control times out.
+            timeout=self.admission.deadline,
+        )
+
+    @cached_property
+    def tools(self):
+        from tools.inventory_tools import search_inventory, browse_catalog
+        from tools.order_tools import buy_product, get_order_history
+        from tools.cart_tools import add_to_cart, view_cart, remove_from_cart, checkout_cart
+        return [search_inventory, browse_catalog, buy_product, add_to_cart, view_cart, remove_from_cart, checkout_cart, get_order_history]
+
+    @cached_property
+    def agent(self):
+        from langchain.agents import create_agent
+        return create_agent(model=self.model, tools=self.tools, system_prompt=SYSTEM_PROMPT)
+
+    async def summarize_history(self, previous_summary: str, messages: list):
+        from langchain_core.messages import HumanMessage
+        from features.memory.service import render_transcript
+        from core.admission import ModelErrorTracker
+        prompt = (
+            "Update the running summary of a conversation between a customer and the SalesMate sales assistant.\n"
+            "Keep facts that matter for later turns: the customer's name, email, sizes, preferences, "
+            "products discussed and orders placed. Be concise, at most a few sentences.\n\n"
+            f"Current summary:\n{previous_summary or '(none)'}\n\n"
+            f"New messages:\n{render_transcript(messages)}"
+        )
+        # Shares the in-flight cap and circuit breaker with chat turns; a
+        # Rejected here makes the fold fall back to its extractive summary.
+        result = await self.admission.run(
+            None, lambda: self.model.ainvoke([HumanMessage(content=prompt)], config={"callbacks": [ModelErrorTracker()]}),
+        )
+        return result.text
+
+services = Services()
@@ -0,0 +1,147 @@
+import os
+import hashlib
+import contextvars
+import urllib.request
+from io import BytesIO
+from pathlib import Path
+from telegram import InputMediaPhoto
+from telegram.error import BadRequest
+from core.metrics import span
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+MEDIA_GROUP_LIMIT = 10
+MEDIA_CACHE_DIR = Path(os.getenv("MEDIA_CACHE_DIR", "media_cache"))
+THUMBNAIL_MAX_SIDE = int(os.getenv("THUMBNAIL_MAX_SIDE", 640))
+
+# Products returned by tools during the current turn, in order.
+shown_products = contextvars.ContextVar("shown_products", default=None)
+
+def remember_products(products):
+    shown = shown_products.get()
+    if shown is not None:
+        shown.extend(products)
+
+def thumbnail_path(image_url):
+    return MEDIA_CACHE_DIR / (hashlib.sha1(image_url.encode()).hexdigest() + ".jpg")
+
+def build_thumbnail(image_url, timeout=15):
+    """
+    Downloads image_url into the local media cache, downscaled to
+    THUMBNAIL_MAX_SIDE when Pillow is installed. Returns the path.
+    """
+    path = thumbnail_path(image_url)
+    if path.exists():
+        return path
+    MEDIA_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    request = urllib.request.Request(image_url, headers={"User-Agent": "SalesMate/1.0"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        data = response.read()
+
+    tmp = path.with_suffix(".tmp")
+    if Image is None:
+        tmp.write_bytes(data)
+    else:
+        image = Image.open(BytesIO(data))
+        image.thumbnail((THUMBNAIL_MAX_SIDE, THUMBNAIL_MAX_SIDE))
+        image.convert("RGB").save(tmp, "JPEG", quality=85, optimize=True)
+    tmp.replace(path)
+    return path
+
+def mentioned_products(text, products, limit=MEDIA_GROUP_LIMIT):
+    """Products whose name appears in text, deduplicated, in order of first mention."""
+    lowered = (text or "").lower()
+    found = []
+    seen = set()
+    for product in products:
+        name = (product.get("name") or "").lower()
+        if product["_id"] in seen or not name or name not in lowered:
+            continue
+        seen.add(product["_id"])
+        found.append((lowered.index(name), product))
+    found.sort(key=lambda pair: pair[0])
+    return [product for _, product in found[:limit]]
+
+class ProductPhotoSender:
+    """
+    Sends product photos to a chat, uploading each image at most once.
+
+    The first send uses the local thumbnail (see scripts/build_thumbnails.py)
+    or lets Telegram fetch image_url. The file_id Telegram returns is stored
+    on the inventory document together with the URL it came from, so later
+    sends are references to Telegram's copy and nothing is uploaded.
+
+    `bot` only needs send_photo and send_media_group, so a stub can stand
+    in for the Bot API.
+    """
+
+    def __init__(self, inventory_service):
+        self.inventory_service = inventory_service
+        self._file_ids = {}
+
+    def _cached_file_id(self, product):
+        image_url = product.get("image_url")
+        cached = self._file_ids.get(product["_id"])
+        if cached and cached[1] == image_url:
+            return cached[0]
+        if product.get("telegram_file_id") and product.get("telegram_file_source") == image_url:
+            return product["telegram_file_id"]
+        return None
+
+    def _media(self, product, use_cache=True):
+        file_id = self._cached_file_id(product) if use_cache else None
+        if file_id:
+            return file_id
+        image_url = product["image_url"]
+        path = thumbnail_path(image_url)
+        return path if path.exists() else image_url
+
+    @staticmethod
+    def _caption(product):
+        price = product.get("price")
+        return f"{product['name']} - ${price:.2f}" if price is not None else product["name"]
+
+    async def send(self, bot, chat_id, products):
+        products = [product for product in products if product.get("image_url")]
+        if not products:
+            return
+        with span("photo_send", photos=len(products)):
+            # Search results don't carry file ids; look up the ones this process hasn't seen yet,
+            # including those other workers stored since the catalog snapshot was taken.
+            unknown = [product["_id"] for product in products if not self._cached_file_id(product)]
+            if unknown:
+                stored = await self.inventory_service.get_telegram_file_ids_async(unknown)
+                products = [dict(product, **stored.get(product["_id"], {})) for product in products]
+
+            new_file_ids = {}
+            for start in range(0, len(products), MEDIA_GROUP_LIMIT):
+                chunk = products[start:start + MEDIA_GROUP_LIMIT]
+                try:
+                    sent = await self._send_chunk(bot, chat_id, chunk, use_cache=True)
+                except BadRequest as e:
+                    # A cached file_id can go stale (e.g. a different bot token); upload again.
+                    print(f"Sending cached product photos failed ({e}), re-uploading.")
+                    sent = await self._send_chunk(bot, chat_id, chunk, use_cache=False)
+                for product, message in zip(chunk, sent):
+                    photo = getattr(message, "photo", None)
+                    if not photo:
+                        continue
+                    file_id = photo[-1].file_id
+                    # Products served from this process's cache don't carry the stored id; compare with what was sent.
+                    if file_id != self._cached_file_id(product):
+                        new_file_ids[product["_id"]] = (file_id, product["image_url"])
+
+            if new_file_ids:
+                self._file_ids.update(new_file_ids)
+                await self.inventory_service.set_telegram_file_ids_async(new_file_ids)
+
+    async def _send_chunk(self, bot, chat_id, chunk, use_cache):
+        if len(chunk) == 1:
+            product = chunk[0]
+            message = await bot.send_photo(chat_id=chat_id, photo=self._media(product, use_cache), caption=self._caption(product))
+            return [message]
+        media = [InputMediaPhoto(media=self._media(product, use_cache), caption=self._caption(product)) for product in chunk]
+        return await bot.send_media_group(chat_id=chat_id, media=media)
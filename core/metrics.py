@@ -0,0 +1,234 @@
+import os
+import json
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pymongo import monitoring
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TRACE_LOG = os.getenv("TRACE_LOG", "false").lower() in ("1", "true", "yes", "json")
+
+current_session = contextvars.ContextVar("current_session", default=None)
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key, extra=None):
+    pairs = list(key) + (extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs) + "}"
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, value_sum) in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {total}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {value_sum}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {total}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.gauges = []
+
+    def counter(self, name, help_text):
+        metric = Counter(name, help_text)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name, help_text, callback):
+        """callback() returns {labels_tuple_or_None: value} and is read at scrape time."""
+        self.gauges.append((name, help_text, callback))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, help_text, callback in self.gauges:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            try:
+                for labels, value in callback().items():
+                    lines.append(f"{name}{_format_labels(labels or ())} {value}")
+            except Exception as e:
+                lines.append(f"# {name} unavailable: {e}")
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+stage_seconds = registry.histogram("salesmate_stage_seconds", "Time spent in each message pipeline stage.")
+tool_seconds = registry.histogram("salesmate_tool_seconds", "Agent tool call duration.")
+tool_errors = registry.counter("salesmate_tool_errors_total", "Agent tool calls that raised.")
+llm_seconds = registry.histogram("salesmate_llm_seconds", "Chat model call duration.")
+llm_tokens = registry.counter("salesmate_llm_tokens_total", "Chat model tokens by direction.")
+mongo_seconds = registry.histogram("salesmate_mongo_command_seconds", "MongoDB command duration.")
+mongo_failures = registry.counter("salesmate_mongo_command_failures_total", "MongoDB commands that failed.")
+
+def log_event(event, **fields):
+    if TRACE_LOG:
+        fields.setdefault("session_id", current_session.get())
+        print(json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str))
+
+@contextmanager
+def span(stage, **fields):
+    """Times a pipeline stage into salesmate_stage_seconds and the trace log."""
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage)
+        log_event("span", stage=stage, ms=round(elapsed * 1000, 2), error=error, **fields)
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+
+    def failed(self, event):
+        mongo_seconds.observe(event.duration_micros / 1e6, command=event.command_name)
+        mongo_failures.inc(command=event.command_name)
+
+mongo_command_metrics = MongoCommandMetrics()
+
+class AgentMetricsCallback(BaseCallbackHandler):
+    """Records chat model latency, token usage and tool timings for one agent run."""
+
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        start = self._started.pop(run_id, None)
+        if start is not None:
+            elapsed = time.perf_counter() - start
+            llm_seconds.observe(elapsed)
+        usage = {}
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None) or usage
+        if usage:
+            llm_tokens.inc(usage.get("input_tokens", 0), direction="input")
+            llm_tokens.inc(usage.get("output_tokens", 0), direction="output")
+        log_event("llm", ms=round(elapsed * 1000, 2) if start else None,
+                  input_tokens=usage.get("input_tokens"), output_tokens=usage.get("output_tokens"))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._started[run_id] = (time.perf_counter(), (serialized or {}).get("name") or kwargs.get("name"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id, None)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, type(error).__name__)
+
+    def _finish_tool(self, run_id, error):
+        started = self._started.pop(run_id, None)
+        if not started:
+            return
+        start, name = started
+        elapsed = time.perf_counter() - start
+        tool_seconds.observe(elapsed, tool=name)
+        if error:
+            tool_errors.inc(tool=name)
+        log_event("tool", tool=name, ms=round(elapsed * 1000, 2), error=error)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+_server = None
+
+def start_metrics_server():
+    """Serves /metrics on METRICS_PORT (offset by the webhook worker index, if any)."""
+    global _server
+    port = int(os.getenv("METRICS_PORT", 0))
+    if not port or _server:
+        return
+    port += int(os.getenv("BOT_WORKER_INDEX", -1)) + 1
+    try:
+        _server = ThreadingHTTPServer((os.getenv("METRICS_LISTEN", "0.0.0.0"), port), _MetricsHandler)
+    except OSError as e:
+        print(f"Metrics server could not bind port {port}: {e}")
+        return
+    threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Metrics available on :{port}/metrics")
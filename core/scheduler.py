@@ -0,0 +1,81 @@
+import os
+import asyncio
+from telegram.ext import BaseUpdateProcessor
+
+class ChatKeyedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates from different chats concurrently while keeping the
+    updates of any single chat strictly in arrival order.
+
+    The base class semaphore is sized to the whole backlog
+    (`max_pending_total`), so updates waiting behind their chat's lock
+    never block other chats; the expensive part of a turn, the LLM call,
+    is capped separately by admission control. Chats that queue up more
+    than `max_pending_per_chat` updates, or a backlog beyond
+    `max_pending_total`, have further updates dropped.
+    """
+
+    def __init__(self, max_pending_per_chat=None, max_pending_total=None):
+        self.max_pending_per_chat = max_pending_per_chat or int(os.getenv("BOT_MAX_PENDING_PER_CHAT", 5))
+        self.max_pending_total = max_pending_total or int(os.getenv("BOT_MAX_PENDING_TOTAL", 1000))
+        # One slot more than the backlog, so the update over the limit reaches
+        # do_process_update and is dropped instead of waiting at the semaphore.
+        super().__init__(self.max_pending_total + 1)
+        self.dropped = 0
+        self._locks = {}
+        self._pending = {}
+        self._total_pending = 0
+        self._warned = set()
+
+    @staticmethod
+    def _key(update):
+        chat = getattr(update, "effective_chat", None)
+        if chat:
+            return chat.id
+        user = getattr(update, "effective_user", None)
+        if user:
+            return f"user:{user.id}"
+        return None
+
+    async def do_process_update(self, update, coroutine):
+        key = self._key(update)
+        if key is None:
+            await coroutine
+            return
+
+        if self._pending.get(key, 0) >= self.max_pending_per_chat or self._total_pending >= self.max_pending_total:
+            coroutine.close()
+            self.dropped += 1
+            if key not in self._warned:
+                self._warned.add(key)
+                await self._warn(update)
+            return
+
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._total_pending += 1
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._total_pending -= 1
+            self._pending[key] -= 1
+            if not self._pending[key]:
+                del self._pending[key]
+                self._locks.pop(key, None)
+                self._warned.discard(key)
+
+    async def _warn(self, update):
+        message = getattr(update, "effective_message", None)
+        if not message:
+            return
+        try:
+            await message.reply_text("You're sending messages faster than I can answer. I'll reply to the ones I already have first.")
+        except Exception as e:
+            print(f"Could not send backpressure notice: {e}")
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
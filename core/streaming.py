@@ -0,0 +1,88 @@
+import os
+import time
+import asyncio
+from telegram.error import BadRequest, RetryAfter, TelegramError
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+
+class StreamingReply:
+    """
+    Shows a reply while it is being generated by editing one Telegram
+    message in place.
+
+    A placeholder is sent right away. Partial text is pushed with
+    `update()`, which only edits when at least `min_interval` seconds and
+    `min_chars` new characters have passed, and backs off when Telegram
+    answers with RetryAfter. These progress edits are best-effort: if one
+    fails, streaming stops for this reply instead of raising into the
+    agent run. `finish()` writes the final text with Markdown, falling
+    back to plain text, and is the only call that may raise.
+    """
+
+    def __init__(self, message, placeholder="…", min_interval=None, min_chars=None):
+        self.message = message
+        self.placeholder = placeholder
+        self.min_interval = min_interval or float(os.getenv("STREAM_EDIT_INTERVAL_SECONDS", 1.0))
+        self.min_chars = min_chars or int(os.getenv("STREAM_EDIT_MIN_CHARS", 30))
+        self.sent = None
+        self._shown = ""
+        self._last_edit = 0.0
+        self._blocked_until = 0.0
+        self._stopped = False
+
+    async def start(self):
+        self.sent = await self.message.reply_text(self.placeholder)
+        self._last_edit = time.monotonic()
+
+    async def update(self, text):
+        now = time.monotonic()
+        if not self.sent or self._stopped or now < self._blocked_until:
+            return
+        if now - self._last_edit < self.min_interval or len(text) - len(self._shown) < self.min_chars:
+            return
+        try:
+            await self._edit(text[:TELEGRAM_MESSAGE_LIMIT - 1] + "…")
+        except TelegramError as e:
+            print(f"Stopped streaming reply after a failed edit: {e}")
+            self._stopped = True
+
+    async def finish(self, text):
+        text = text or "Sorry, I couldn't come up with an answer."
+        chunks = [text[i:i + TELEGRAM_MESSAGE_LIMIT] for i in range(0, len(text), TELEGRAM_MESSAGE_LIMIT)]
+
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+        if self.sent:
+            await self._edit(chunks[0], parse_mode="Markdown", final=True)
+        else:
+            await self._reply(chunks[0])
+        for chunk in chunks[1:]:
+            await self._reply(chunk)
+
+    async def _reply(self, text):
+        try:
+            await self.message.reply_text(text, parse_mode="Markdown")
+        except BadRequest:
+            await self.message.reply_text(text)
+
+    async def _edit(self, text, parse_mode=None, final=False):
+        try:
+            await self.sent.edit_text(text, parse_mode=parse_mode)
+            self._shown = text
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+            self._blocked_until = time.monotonic() + retry_after
+            if final:
+                await asyncio.sleep(retry_after)
+                await self._edit(text, parse_mode, final)
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                pass
+            elif parse_mode:
+                # Usually unbalanced Markdown from the model; show it as plain text.
+                await self._edit(text, None, final)
+            else:
+                raise
+        self._last_edit = time.monotonic()
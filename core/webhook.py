@@ -0,0 +1,204 @@
+import os
+import hmac
+import json
+import zlib
+import queue
+import asyncio
+import importlib
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Telegram updates are a few KB; anything far larger is not from Telegram.
+MAX_BODY_BYTES = 1024 * 1024
+CHAT_CONTAINERS = (
+    "message", "edited_message", "channel_post", "edited_channel_post",
+    "business_message", "edited_business_message", "my_chat_member",
+    "chat_member", "chat_join_request",
+)
+
+def extract_chat_id(update):
+    """Best-effort chat ID for routing a raw Telegram update."""
+    for field in CHAT_CONTAINERS:
+        chat = (update.get(field) or {}).get("chat")
+        if chat and "id" in chat:
+            return chat["id"]
+    callback = update.get("callback_query") or {}
+    chat = (callback.get("message") or {}).get("chat")
+    if chat and "id" in chat:
+        return chat["id"]
+    for field in ("callback_query", "inline_query", "chosen_inline_result", "shipping_query", "pre_checkout_query"):
+        sender = (update.get(field) or {}).get("from")
+        if sender and "id" in sender:
+            return sender["id"]
+    return update.get("update_id", 0)
+
+def shard_for(chat_id, shards: int):
+    return zlib.crc32(str(chat_id).encode()) % shards
+
+def _load_factory(path):
+    module_name, attr = path.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+def _worker_main(shard, update_queue, factory_path):
+    os.environ["BOT_WORKER_INDEX"] = str(shard)
+    asyncio.run(_worker_loop(shard, update_queue, factory_path))
+
+async def _worker_loop(shard, update_queue, factory_path):
+    from telegram import Update
+
+    app = _load_factory(factory_path)()
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    await app.start()
+    print(f"Webhook worker {shard} ready.")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            payload = await loop.run_in_executor(None, update_queue.get)
+            if payload is None:
+                break
+            try:
+                update = Update.de_json(json.loads(payload), app.bot)
+            except Exception as e:
+                print(f"Webhook worker {shard} dropped malformed update: {e}")
+                continue
+            await app.update_queue.put(update)
+    finally:
+        await app.stop()
+        if app.post_stop:
+            await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)
+
+class WebhookIngress(ThreadingHTTPServer):
+    """
+    HTTP endpoint for Telegram webhooks that routes each update to a
+    worker process by a hash of its chat ID, so all state for a chat is
+    handled by one worker.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, queues, path, secret):
+        if not secret:
+            raise ValueError("A webhook secret is required")
+        super().__init__(address, _IngressHandler)
+        self.queues = queues
+        self.webhook_path = path
+        self.secret = secret
+        self.routed = [0] * len(queues)
+        self.rejected = 0
+
+    def route(self, payload: bytes):
+        update = json.loads(payload)
+        if not isinstance(update, dict):
+            raise ValueError("Update must be a JSON object")
+        shard = shard_for(extract_chat_id(update), len(self.queues))
+        self.queues[shard].put_nowait(payload)
+        self.routed[shard] += 1
+        return shard
+
+class _IngressHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        if self.path != server.webhook_path:
+            return self._respond(404)
+        if not hmac.compare_digest(self.headers.get(SECRET_HEADER, "").encode(), server.secret.encode()):
+            return self._respond(403)
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return self._respond(400)
+        if length < 0 or length > MAX_BODY_BYTES:
+            self.close_connection = True
+            return self._respond(413)
+        payload = self.rfile.read(length)
+        try:
+            server.route(payload)
+        except ValueError:
+            return self._respond(400)
+        except queue.Full:
+            # Telegram retries non-2xx deliveries, which gives us backpressure for free.
+            server.rejected += 1
+            return self._respond(503)
+        self._respond(200)
+
+    def do_GET(self):
+        if self.path != "/healthz":
+            return self._respond(404)
+        body = json.dumps({"routed": self.server.routed, "rejected": self.server.rejected})
+        self._respond(200, body)
+
+    def _respond(self, status, body=""):
+        data = body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+async def _register_webhook(url, secret):
+    from telegram import Bot, Update
+
+    async with Bot(os.getenv("TELEGRAM_BOT_TOKEN")) as bot:
+        await bot.set_webhook(
+            url=url,
+            secret_token=secret,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=int(os.getenv("WEBHOOK_MAX_CONNECTIONS", 40)),
+        )
+
+def serve_webhook(factory_path: str):
+    """
+    Runs the bot in webhook mode: one HTTP ingress plus WEBHOOK_WORKERS
+    worker processes, each with its own Application built by the factory
+    at `factory_path` ("module:function").
+
+    Workers share all state through MongoDB, so several nodes can run this
+    behind a load balancer; routing by chat inside a node keeps each chat's
+    updates ordered on a single worker.
+    """
+    workers = int(os.getenv("WEBHOOK_WORKERS", os.cpu_count() or 1))
+    listen = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+    port = int(os.getenv("WEBHOOK_PORT", 8443))
+    path = os.getenv("WEBHOOK_PATH", "/telegram")
+    secret = os.getenv("WEBHOOK_SECRET")
+    if not secret:
+        # Without it anyone who finds the ingress could post updates for any chat.
+        raise SystemExit("WEBHOOK_SECRET must be set in webhook mode.")
+    public_url = os.getenv("WEBHOOK_URL")
+    queue_size = int(os.getenv("WEBHOOK_QUEUE_SIZE", 1000))
+
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue(maxsize=queue_size) for _ in range(workers)]
+    processes = [
+        context.Process(target=_worker_main, args=(i, queues[i], factory_path), name=f"bot-worker-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    if public_url:
+        asyncio.run(_register_webhook(public_url.rstrip("/") + path, secret))
+        print(f"Webhook registered at {public_url.rstrip('/')}{path}")
+
+    server = WebhookIngress((listen, port), queues, path, secret)
+    print(f"Bot started. Webhook ingress on {listen}:{port}{path} with {workers} workers...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for q in queues:
+            q.put(None)
+        for process in processes:
+            process.join(timeout=10)
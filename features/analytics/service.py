@@ -0,0 +1,212 @@
+import os
+import threading
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import DESCENDING, ReadPreference
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from config.db import db, run_db
+
+STATE_ID = "sales"
+
+def _accumulate(sums, latest=(), maxima=()):
+    """
+    $merge whenMatched pipeline that adds a batch to an existing rollup
+    document once. Documents remember the last batch they absorbed, so a
+    batch that is replayed after a crash is not counted twice.
+    """
+    fresh = {"$lt": [{"$ifNull": ["$last_batch", ""]}, "$$new.last_batch"]}
+    update = {field: {"$cond": [fresh, {"$add": [f"${field}", f"$$new.{field}"]}, f"${field}"]} for field in sums}
+    update.update({field: {"$cond": [fresh, f"$$new.{field}", f"${field}"]} for field in latest})
+    update.update({field: {"$max": [f"${field}", f"$$new.{field}"]} for field in maxima})
+    update["last_batch"] = {"$max": ["$last_batch", "$$new.last_batch"]}
+    return [{"$set": update}]
+
+class SalesAnalytics:
+    """
+    Sales rollups maintained incrementally from the orders collection.
+
+    `refresh()` aggregates only the orders placed since the last run (an
+    ObjectId high-water mark) and folds them into three small collections
+    with $merge: sales_daily (per day), sales_by_product and
+    sales_by_category. Reports read those collections by index and never
+    scan orders; the aggregation itself reads from a secondary when there
+    is one, so reporting stays off the checkout path.
+    """
+
+    def __init__(self):
+        self.orders = db["orders"].with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+        self.daily = db["sales_daily"]
+        self.products = db["sales_by_product"]
+        self.categories = db["sales_by_category"]
+        self.state = db["analytics_state"]
+        # Orders younger than this are left for the next run, so inserts
+        # still in flight from other workers are never skipped.
+        self.lag = timedelta(seconds=float(os.getenv("ANALYTICS_LAG_SECONDS", 5)))
+        self.interval = float(os.getenv("ANALYTICS_REFRESH_SECONDS", 60))
+        self.lease = timedelta(seconds=float(os.getenv("ANALYTICS_LEASE_SECONDS", 300)))
+        self._stop = threading.Event()
+        self._thread = None
+
+    def ensure_indexes(self):
+        self.products.create_index([("revenue", DESCENDING)])
+        self.products.create_index([("units", DESCENDING)])
+        self.categories.create_index([("revenue", DESCENDING)])
+
+    def _claim(self, now):
+        try:
+            return self.state.find_one_and_update(
+                {"_id": STATE_ID, "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"lease_until": now + self.lease}},
+                upsert=True,
+                return_document=True,
+            )
+        except DuplicateKeyError:
+            # Another worker holds the lease.
+            return None
+
+    def refresh(self):
+        """
+        Folds orders placed since the last refresh into the rollups.
+
+        Returns:
+            False if another worker is already refreshing, True otherwise.
+        """
+        now = datetime.utcnow()
+        state = self._claim(now)
+        if state is None:
+            return False
+        try:
+            high_water = state.get("high_water")
+            upper = state.get("pending_upper")
+            if upper is None:
+                upper = ObjectId.from_datetime(now - self.lag)
+                if high_water is not None and upper <= high_water:
+                    return True
+                # Remember the window first so a crashed run replays exactly the same batch.
+                self.state.update_one({"_id": STATE_ID}, {"$set": {"pending_upper": upper}})
+
+            window = {"$lt": upper}
+            if high_water is not None:
+                window["$gte"] = high_water
+            self._merge({"_id": window, "status": "paid"}, str(upper))
+
+            self.state.update_one(
+                {"_id": STATE_ID},
+                {"$set": {"high_water": upper, "refreshed_at": now}, "$unset": {"pending_upper": "", "lease_until": ""}},
+            )
+            return True
+        except Exception:
+            self.state.update_one({"_id": STATE_ID}, {"$unset": {"lease_until": ""}})
+            raise
+
+    def _merge(self, match, batch):
+        self.orders.aggregate([
+            {"$match": match},
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "orders": {"$sum": 1},
+                "units": {"$sum": {"$sum": "$items.quantity"}},
+                "revenue": {"$sum": "$total_amount"},
+            }},
+            {"$set": {"last_batch": batch}},
+            {"$merge": {"into": self.daily.name, "whenMatched": _accumulate(["orders", "units", "revenue"]), "whenNotMatched": "insert"}},
+        ])
+        self.orders.aggregate([
+            {"$match": match},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": {"$ifNull": ["$items.product_id", "$items.name"]},
+                "name": {"$last": "$items.name"},
+                "category": {"$last": "$items.category"},
+                "orders": {"$sum": 1},
+                "units": {"$sum": "$items.quantity"},
+                "revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}},
+                "last_sold_at": {"$max": "$created_at"},
+            }},
+            {"$set": {"last_batch": batch}},
+            {"$merge": {
+                "into": self.products.name,
+                "whenMatched": _accumulate(["orders", "units", "revenue"], latest=["name", "category"], maxima=["last_sold_at"]),
+                "whenNotMatched": "insert",
+            }},
+        ])
+        self.orders.aggregate([
+            {"$match": match},
+            {"$unwind": "$items"},
+            {"$group": {
+                "_id": {"$ifNull": ["$items.category", "Uncategorized"]},
+                "units": {"$sum": "$items.quantity"},
+                "revenue": {"$sum": {"$multiply": ["$items.price", "$items.quantity"]}},
+            }},
+            {"$set": {"last_batch": batch}},
+            {"$merge": {"into": self.categories.name, "whenMatched": _accumulate(["units", "revenue"]), "whenNotMatched": "insert"}},
+        ])
+
+    def rebuild(self):
+        """Drops the rollups and recomputes them from all orders."""
+        for collection in (self.daily, self.products, self.categories):
+            collection.drop()
+        self.state.delete_one({"_id": STATE_ID})
+        self.ensure_indexes()
+        self.refresh()
+
+    def report(self, days: int = 7, top: int = 5):
+        """
+        Reads the rollups: revenue per day for the last `days` days, the
+        `top` products by revenue and totals per category.
+        """
+        since = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        state = self.state.find_one({"_id": STATE_ID}, {"high_water": 1}) or {}
+        high_water = state.get("high_water")
+        return {
+            "as_of": high_water.generation_time if high_water else None,
+            "daily": list(self.daily.find({"_id": {"$gte": since}}, {"last_batch": 0}).sort("_id", DESCENDING)),
+            "top_products": list(self.products.find({}, {"last_batch": 0}).sort("revenue", DESCENDING).limit(top)),
+            "categories": list(self.categories.find({}, {"last_batch": 0}).sort("revenue", DESCENDING)),
+        }
+
+    async def report_async(self, days: int = 7, top: int = 5):
+        return await run_db(self.report, days, top)
+
+    def start(self):
+        if self._thread or self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="sales-rollup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except PyMongoError as e:
+                print(f"Sales rollup failed: {e}")
+            self._stop.wait(self.interval)
+
+def format_report(report):
+    lines = []
+    if report["as_of"]:
+        lines.append(f"Sales as of {report['as_of']:%Y-%m-%d %H:%M} UTC")
+    else:
+        lines.append("No sales have been rolled up yet.")
+
+    lines.append("\nRevenue per day:")
+    for day in report["daily"] or []:
+        lines.append(f"  {day['_id']}: ${day['revenue']:.2f} ({day['orders']} orders, {day['units']} units)")
+    if not report["daily"]:
+        lines.append("  (none)")
+
+    lines.append("\nTop products:")
+    for product in report["top_products"]:
+        lines.append(f"  {product.get('name', product['_id'])}: ${product['revenue']:.2f} ({product['units']} units)")
+    if not report["top_products"]:
+        lines.append("  (none)")
+
+    lines.append("\nBy category:")
+    for category in report["categories"]:
+        lines.append(f"  {category['_id']}: ${category['revenue']:.2f} ({category['units']} units)")
+    if not report["categories"]:
+        lines.append("  (none)")
+    return "\n".join(lines)
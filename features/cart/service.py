@@ -0,0 +1,93 @@
+import os
+from datetime import datetime
+from pymongo import ReturnDocument
+from config.db import db, run_db
+from features.inventory.service import InventoryService
+
+class CartService:
+    """
+    One cart per chat session, stored in the `carts` collection.
+
+    Items keep the product ID, name, SKU and quantity; prices are shown
+    from the current inventory and only fixed when the cart is checked
+    out. Carts nobody touched for CART_TTL_DAYS are removed by Mongo.
+    """
+
+    def __init__(self, inventory_service=None):
+        self.collection = db["carts"]
+        self.inventory_service = inventory_service or InventoryService()
+        self.ttl_days = int(os.getenv("CART_TTL_DAYS", 7))
+
+    def ensure_indexes(self):
+        self.collection.create_index("session_id", unique=True)
+        self.collection.create_index("updated_at", expireAfterSeconds=self.ttl_days * 86400)
+
+    def add_item(self, session_id: str, product: dict, quantity: int = 1):
+        """
+        Adds a product (with _id, name and sku) to the cart, or increases its quantity.
+
+        Returns:
+            The updated cart document.
+        """
+        if quantity < 1:
+            raise ValueError("Quantity must be at least 1.")
+        now = datetime.utcnow()
+        item = {"product_id": product["_id"], "name": product["name"], "sku": product.get("sku"), "quantity": quantity}
+        items = {"$ifNull": ["$items", []]}
+        product_id = {"$literal": product["_id"]}
+        # One atomic pipeline upsert, so parallel adds of the same product can't push two lines.
+        return self.collection.find_one_and_update(
+            {"session_id": session_id},
+            [{"$set": {
+                "items": {"$cond": [
+                    {"$in": [product_id, {"$map": {"input": items, "as": "item", "in": "$$item.product_id"}}]},
+                    {"$map": {"input": items, "as": "item", "in": {"$cond": [
+                        {"$eq": ["$$item.product_id", product_id]},
+                        {"$mergeObjects": ["$$item", {"quantity": {"$add": ["$$item.quantity", quantity]}}]},
+                        "$$item",
+                    ]}}},
+                    {"$concatArrays": [items, [{"$literal": item}]]},
+                ]},
+                "updated_at": now,
+                "created_at": {"$ifNull": ["$created_at", now]},
+            }}],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def remove_item(self, session_id: str, product_id: str):
+        """Removes a product from the cart; returns False if it was not in it."""
+        result = self.collection.update_one(
+            {"session_id": session_id, "items.product_id": product_id},
+            {"$pull": {"items": {"product_id": product_id}}, "$set": {"updated_at": datetime.utcnow()}},
+        )
+        return result.modified_count > 0
+
+    def get_cart(self, session_id: str):
+        """
+        Returns the cart items with current prices and stock, and the total.
+        """
+        cart = self.collection.find_one({"session_id": session_id}, {"items": 1})
+        items = cart.get("items", []) if cart else []
+        products = self.inventory_service.get_products([item["product_id"] for item in items], fields=("price", "stock"))
+        for item in items:
+            product = products.get(item["product_id"], {})
+            item["price"] = product.get("price")
+            item["stock"] = product.get("stock", 0)
+        total = round(sum((item["price"] or 0) * item["quantity"] for item in items), 2)
+        return {"items": items, "total": total}
+
+    def clear(self, session_id: str):
+        self.collection.delete_one({"session_id": session_id})
+
+    async def add_item_async(self, session_id: str, product: dict, quantity: int = 1):
+        return await run_db(self.add_item, session_id, product, quantity)
+
+    async def remove_item_async(self, session_id: str, product_id: str):
+        return await run_db(self.remove_item, session_id, product_id)
+
+    async def get_cart_async(self, session_id: str):
+        return await run_db(self.get_cart, session_id)
+
+    async def clear_async(self, session_id: str):
+        return await run_db(self.clear, session_id)
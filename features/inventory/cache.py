@@ -0,0 +1,258 @@
+import os
+import re
+import time
+import heapq
+import bisect
+import itertools
+import threading
+from collections import defaultdict
+from pymongo.errors import PyMongoError, OperationFailure
+
+SNAPSHOT_FIELDS = {
+    "name": 1, "category": 1, "category_key": 1, "subcategory": 1, "price": 1,
+    "stock": 1, "sizes": 1, "description": 1, "image_url": 1, "updated_at": 1,
+    "sku": 1, "telegram_file_id": 1, "telegram_file_source": 1,
+}
+FIELD_WEIGHTS = {"name": 10, "subcategory": 5, "description": 1}
+STOPWORDS = {"a", "an", "and", "the", "for", "with", "of", "in", "on", "me", "show", "some", "any", "do", "you", "have"}
+
+def _stem(token):
+    if len(token) > 4 and token.endswith("es") and token[:-2].endswith(("s", "x", "ch", "sh")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def _price(doc):
+    return float(doc.get("price") or 0)
+
+def tokenize(text):
+    if not text:
+        return []
+    return [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS]
+
+class CatalogCache:
+    """
+    In-process snapshot of the inventory with an inverted index.
+
+    Searches and price filters are answered from memory: keyword queries
+    from an inverted index, taking only the top `limit` matches, and
+    filter-only queries from price-sorted lists per category. The snapshot is
+    kept fresh from a change stream, or by polling `updated_at` when the
+    deployment is not a replica set, plus a periodic full reload to pick
+    up deletes that polling cannot see.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.poll_interval = float(os.getenv("CATALOG_CACHE_POLL_SECONDS", 5))
+        self.full_reload_interval = float(os.getenv("CATALOG_CACHE_FULL_RELOAD_SECONDS", 600))
+        self.ready = False
+        self.high_water = None
+        self._products = {}
+        self._weights = {}
+        self._index = defaultdict(set)
+        # (price, product_id) sorted by price, per category_key and under None for the whole catalog.
+        self._by_price = defaultdict(list)
+        self._listeners = []
+        self._lock = threading.RLock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_listener(self, callback):
+        """Registers callback(changed_ids); changed_ids is None after a full reload."""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _notify(self, changed_ids):
+        for callback in self._listeners:
+            try:
+                callback(changed_ids)
+            except Exception as e:
+                print(f"Catalog cache listener failed: {e}")
+
+    def load(self):
+        products = {}
+        weights = {}
+        index = defaultdict(set)
+        by_price = defaultdict(list)
+        high_water = None
+        for doc in self.collection.find({}, SNAPSHOT_FIELDS):
+            product_id = str(doc["_id"])
+            doc["_id"] = product_id
+            products[product_id] = doc
+            weights[product_id] = self._token_weights(doc)
+            for token in weights[product_id]:
+                index[token].add(product_id)
+            for key in self._price_keys(doc):
+                by_price[key].append((_price(doc), product_id))
+            if doc.get("updated_at") and (high_water is None or doc["updated_at"] > high_water):
+                high_water = doc["updated_at"]
+        for entries in by_price.values():
+            entries.sort()
+
+        with self._lock:
+            self._products = products
+            self._weights = weights
+            self._index = index
+            self._by_price = by_price
+            self.high_water = high_water
+            self.ready = True
+        self._notify(None)
+        print(f"Catalog cache loaded {len(products)} products.")
+
+    def _token_weights(self, doc):
+        weights = defaultdict(int)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in set(tokenize(doc.get(field))):
+                weights[token] += weight
+        return dict(weights)
+
+    @staticmethod
+    def _price_keys(doc):
+        return (None, doc.get("category_key")) if doc.get("category_key") else (None,)
+
+    def apply(self, doc):
+        """Upserts a document into the snapshot; returns False if it was already current."""
+        product_id = str(doc["_id"])
+        doc = {k: v for k, v in doc.items() if k in SNAPSHOT_FIELDS or k == "_id"}
+        doc["_id"] = product_id
+        with self._lock:
+            if self._products.get(product_id) == doc:
+                return False
+            self._unindex(product_id)
+            self._products[product_id] = doc
+            self._weights[product_id] = self._token_weights(doc)
+            for token in self._weights[product_id]:
+                self._index[token].add(product_id)
+            for key in self._price_keys(doc):
+                bisect.insort(self._by_price[key], (_price(doc), product_id))
+            if doc.get("updated_at") and (self.high_water is None or doc["updated_at"] > self.high_water):
+                self.high_water = doc["updated_at"]
+        return True
+
+    def remove(self, product_id):
+        with self._lock:
+            self._unindex(str(product_id))
+
+    def _unindex(self, product_id):
+        for token in self._weights.pop(product_id, {}):
+            ids = self._index.get(token)
+            if ids:
+                ids.discard(product_id)
+                if not ids:
+                    del self._index[token]
+        doc = self._products.pop(product_id, None)
+        for key in self._price_keys(doc) if doc else ():
+            entries = self._by_price[key]
+            position = bisect.bisect_left(entries, (_price(doc), product_id))
+            if position < len(entries) and entries[position][1] == product_id:
+                del entries[position]
+
+    def get(self, product_id):
+        with self._lock:
+            doc = self._products.get(str(product_id))
+            return dict(doc) if doc else None
+
+    def search(self, query=None, category=None, min_price=None, max_price=None, limit=10):
+        category_key = category.strip().lower() if category else None
+        low = float(min_price) if min_price is not None else float("-inf")
+        high = float(max_price) if max_price is not None else float("inf")
+        with self._lock:
+            if not query:
+                # Cheapest first, like the (category_key, price) index would return them.
+                entries = self._by_price.get(category_key, [])
+                start = bisect.bisect_left(entries, (low,))
+                results = []
+                for price, product_id in itertools.islice(entries, start, start + limit):
+                    if price > high:
+                        break
+                    results.append(dict(self._products[product_id]))
+                return results
+
+            scores = defaultdict(int)
+            for token in set(tokenize(query)):
+                for product_id in self._index.get(token, ()):
+                    scores[product_id] += self._weights[product_id][token]
+            matches = [
+                product_id for product_id in scores
+                if (not category_key or self._products[product_id].get("category_key") == category_key)
+                and low <= _price(self._products[product_id]) <= high
+            ]
+            top = heapq.nsmallest(limit, matches, key=lambda pid: (-scores[pid], self._products[pid].get("name", "")))
+            return [dict(self._products[product_id]) for product_id in top]
+
+    def start(self):
+        if self._thread:
+            return
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="catalog-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._watch()
+            except OperationFailure as e:
+                if e.code != 40573:
+                    print(f"Catalog cache change stream failed: {e}")
+                    self._stop.wait(self.poll_interval)
+                    continue
+                # Change streams need a replica set; fall back to polling.
+                print("Catalog cache: change streams unavailable, polling updated_at.")
+                self._poll()
+            except PyMongoError as e:
+                print(f"Catalog cache refresh failed: {e}")
+                self._stop.wait(self.poll_interval)
+                try:
+                    self.load()
+                except PyMongoError:
+                    pass
+
+    def _watch(self):
+        last_reload = time.monotonic()
+        with self.collection.watch(full_document="updateLookup", max_await_time_ms=1000) as stream:
+            # Catch up on anything written between the snapshot and the stream opening.
+            self._catch_up()
+            while not self._stop.is_set():
+                change = stream.try_next()
+                if change is None:
+                    if time.monotonic() - last_reload > self.full_reload_interval:
+                        self.load()
+                        last_reload = time.monotonic()
+                    continue
+                product_id = change["documentKey"]["_id"]
+                if change["operationType"] == "delete" or not change.get("fullDocument"):
+                    self.remove(product_id)
+                elif not self.apply(change["fullDocument"]):
+                    continue
+                self._notify([str(product_id)])
+
+    def _poll(self):
+        last_reload = time.monotonic()
+        while not self._stop.wait(self.poll_interval):
+            if time.monotonic() - last_reload > self.full_reload_interval:
+                self.load()
+                last_reload = time.monotonic()
+                continue
+            self._catch_up()
+
+    def _catch_up(self):
+        filter_query = {"updated_at": {"$gte": self.high_water}} if self.high_water else {}
+        changed = [str(doc["_id"]) for doc in self.collection.find(filter_query, SNAPSHOT_FIELDS) if self.apply(doc)]
+        if changed:
+            self._notify(changed)
+
+_catalog_cache = None
+
+def get_catalog_cache(collection):
+    """Returns the process-wide cache, or None when CATALOG_CACHE_ENABLED is off."""
+    global _catalog_cache
+    if os.getenv("CATALOG_CACHE_ENABLED", "false").lower() not in ("1", "true", "yes"):
+        return None
+    if _catalog_cache is None:
+        _catalog_cache = CatalogCache(collection)
+    return _catalog_cache
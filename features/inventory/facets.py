@@ -0,0 +1,138 @@
+import os
+import bisect
+from collections import Counter, defaultdict
+from config.db import run_db
+from features.inventory.incremental import IncrementalIndex
+
+FACET_FIELDS = {"category": 1, "subcategory": 1, "sizes": 1, "price": 1, "stock": 1, "updated_at": 1}
+SIZE_ORDER = ["XXS", "XS", "S", "M", "L", "XL", "XXL", "XXXL"]
+
+def _key(label):
+    return label.strip().lower() if label else None
+
+def _size_sort_key(size):
+    if size in SIZE_ORDER:
+        return (0, SIZE_ORDER.index(size), "")
+    try:
+        return (1, float(size), "")
+    except ValueError:
+        return (2, 0, size)
+
+class FacetIndex(IncrementalIndex):
+    """
+    Product counts by category, subcategory, size and price range, with
+    in-stock counts for each, kept in memory for catalog browsing.
+
+    Counts are kept for the whole catalog, each category, each
+    category/subcategory pair and each subcategory across all categories,
+    so any summary is a few dictionary reads.
+    Kept current as an IncrementalIndex, polling every FACET_POLL_SECONDS
+    and recounting every FACET_RELOAD_SECONDS without the catalog cache.
+    """
+
+    fields = FACET_FIELDS
+    description = "Facet index"
+
+    def __init__(self, collection, catalog_cache=None):
+        super().__init__(
+            collection,
+            catalog_cache,
+            poll_interval=float(os.getenv("FACET_POLL_SECONDS", 30)),
+            reload_interval=float(os.getenv("FACET_RELOAD_SECONDS", 600)),
+        )
+        self.price_bounds = [float(bound) for bound in os.getenv("FACET_PRICE_BUCKETS", "25,50,100,200").split(",")]
+        self._entries = {}
+        self._totals = defaultdict(Counter)
+        self._in_stock = defaultdict(Counter)
+        self._labels = {}
+
+    def _reset(self):
+        self._entries = {}
+        self._totals, self._in_stock = defaultdict(Counter), defaultdict(Counter)
+
+    def _apply(self, product_id, doc):
+        entry = self._entry(doc) if doc else None
+        if entry == self._entries.get(product_id):
+            return
+        self._remove(product_id)
+        if entry:
+            self._count(product_id, entry)
+
+    def price_bucket(self, price):
+        return bisect.bisect_right(self.price_bounds, float(price or 0))
+
+    def price_label(self, bucket):
+        if bucket == 0:
+            return f"under ${self.price_bounds[0]:g}"
+        if bucket == len(self.price_bounds):
+            return f"${self.price_bounds[-1]:g}+"
+        return f"${self.price_bounds[bucket - 1]:g}-{self.price_bounds[bucket]:g}"
+
+    def _entry(self, doc):
+        category = (doc.get("category") or "Uncategorized").strip()
+        subcategory = (doc.get("subcategory") or "Other").strip()
+        values = [("category", category), ("subcategory", subcategory), ("price", self.price_bucket(doc.get("price")))]
+        values.extend(("size", str(size)) for size in dict.fromkeys(doc.get("sizes") or []))
+        scopes = ((None, None), (_key(category), None), (_key(category), _key(subcategory)), (None, _key(subcategory)))
+        return scopes, tuple(values), (doc.get("stock") or 0) > 0
+
+    def _count(self, product_id, entry):
+        scopes, values, in_stock = entry
+        self._entries[product_id] = entry
+        for facet, value in values[:2]:
+            self._labels[_key(value)] = value
+        for scope in scopes:
+            self._totals[scope].update(values + (("products", None),))
+            if in_stock:
+                self._in_stock[scope].update(values + (("products", None),))
+
+    def _remove(self, product_id):
+        entry = self._entries.pop(product_id, None)
+        if not entry:
+            return
+        scopes, values, in_stock = entry
+        for scope in scopes:
+            for counts in (self._totals, self._in_stock) if in_stock else (self._totals,):
+                counts[scope].subtract(values + (("products", None),))
+                for value in values + (("products", None),):
+                    if counts[scope][value] <= 0:
+                        del counts[scope][value]
+                if not counts[scope]:
+                    del counts[scope]
+
+    def summary(self, category=None, subcategory=None):
+        """
+        Returns the facet counts for the whole catalog, one category, one
+        subcategory of it or one subcategory across all categories, or None
+        if there is no such category or subcategory.
+
+        Each facet is a list of (value, products, in stock): "categories"
+        at the top level and for a subcategory on its own, "subcategories"
+        for a category, "sizes" and "price_ranges".
+        """
+        scope = (_key(category), _key(subcategory))
+        with self._lock:
+            totals = self._totals.get(scope)
+            if not totals:
+                return None
+            in_stock = self._in_stock.get(scope, Counter())
+
+            def facet(name, order=None):
+                values = [value for facet_name, value in totals if facet_name == name]
+                values.sort(key=order)
+                return [(value, totals[(name, value)], in_stock[(name, value)]) for value in values]
+
+            return {
+                "scope": " / ".join(self._labels.get(key, key) for key in scope if key) or "All products",
+                "products": totals[("products", None)],
+                "in_stock": in_stock[("products", None)],
+                "categories": facet("category") if category is None else [],
+                "subcategories": facet("subcategory") if category is not None and subcategory is None else [],
+                "sizes": facet("size", _size_sort_key),
+                "price_ranges": [(self.price_label(bucket), total, available) for bucket, total, available in facet("price")],
+            }
+
+    async def summary_async(self, category=None, subcategory=None):
+        if self.needs_refresh:
+            await run_db(self.refresh)
+        return self.summary(category, subcategory)
@@ -0,0 +1,108 @@
+import time
+import threading
+from bson import ObjectId
+
+class IncrementalIndex:
+    """
+    Base for in-memory indexes over the inventory that are kept current
+    without re-reading the whole catalog.
+
+    Inventory changes mark products dirty and only those are re-read and
+    re-applied on the next refresh; changed_ids=None forces a full reload.
+    Without the catalog cache, writes made by other processes are picked
+    up by polling `updated_at` every `poll_interval` seconds, with a full
+    reload every `reload_interval` seconds (which also catches deletes).
+
+    Subclasses set `fields` (the projection they need, with updated_at)
+    and `description`, and implement `_reset()` and `_apply(product_id,
+    doc)`, where doc is None for a product that no longer exists. Both are
+    called with the lock held.
+    """
+
+    fields = {"updated_at": 1}
+    description = "Inventory index"
+
+    def __init__(self, collection, catalog_cache=None, poll_interval=30, reload_interval=600):
+        self.collection = collection
+        self.catalog_cache = catalog_cache
+        self.poll_interval = poll_interval
+        self.reload_interval = reload_interval
+        self.high_water = None
+        self._loaded_at = 0.0
+        self._polled_at = 0.0
+        self._dirty = set()
+        self._stale = True
+        self._lock = threading.RLock()
+
+    def _reset(self):
+        raise NotImplementedError
+
+    def _apply(self, product_id, doc):
+        raise NotImplementedError
+
+    def invalidate(self, changed_ids=None):
+        with self._lock:
+            if changed_ids is None:
+                self._stale = True
+            else:
+                self._dirty.update(str(product_id) for product_id in changed_ids)
+
+    @property
+    def polling(self):
+        # The catalog cache follows other processes' writes itself and reports them as changes.
+        return not (self.catalog_cache and self.catalog_cache.ready)
+
+    @property
+    def needs_refresh(self):
+        if self._stale or self._dirty:
+            return True
+        now = time.monotonic()
+        return self.polling and (now - self._polled_at >= self.poll_interval or now - self._loaded_at >= self.reload_interval)
+
+    def load(self):
+        with self._lock:
+            self._stale = False
+            self._dirty.clear()
+        docs = list(self.collection.find({}, self.fields))
+        with self._lock:
+            self._reset()
+            for doc in docs:
+                self._apply(str(doc["_id"]), doc)
+            self.high_water = max((doc["updated_at"] for doc in docs if doc.get("updated_at")), default=None)
+            self._loaded_at = self._polled_at = time.monotonic()
+        print(f"{self.description} loaded {len(docs)} products.")
+
+    def _poll(self):
+        """Returns {product_id: doc} for products written since the last poll, by any process."""
+        self._polled_at = time.monotonic()
+        filter_query = {"updated_at": {"$gte": self.high_water}} if self.high_water else {}
+        docs = {}
+        for doc in self.collection.find(filter_query, self.fields):
+            docs[str(doc["_id"])] = doc
+            if doc.get("updated_at") and (self.high_water is None or doc["updated_at"] > self.high_water):
+                self.high_water = doc["updated_at"]
+        return docs
+
+    def refresh(self):
+        if self._stale or (self.polling and time.monotonic() - self._loaded_at >= self.reload_interval):
+            self.load()
+            return
+        polled = self._poll() if self.polling and time.monotonic() - self._polled_at >= self.poll_interval else {}
+        with self._lock:
+            dirty, self._dirty = self._dirty | set(polled), set()
+        if not dirty:
+            return
+
+        docs = dict(polled)
+        missing = [product_id for product_id in dirty if product_id not in docs]
+        if missing and self.catalog_cache and self.catalog_cache.ready:
+            docs.update({product_id: self.catalog_cache.get(product_id) for product_id in missing})
+            missing = [product_id for product_id in missing if not docs[product_id]]
+        if missing:
+            ids = [ObjectId(product_id) for product_id in missing if ObjectId.is_valid(product_id)]
+            for doc in self.collection.find({"_id": {"$in": ids}}, self.fields):
+                docs[str(doc["_id"])] = doc
+
+        with self._lock:
+            for product_id in dirty:
+                self._apply(product_id, docs.get(product_id))
@@ -0,0 +1,196 @@
+import os
+import re
+import time
+import heapq
+from collections import defaultdict
+from config.db import run_db
+from features.inventory.incremental import IncrementalIndex
+
+# A lookup without an exact match polls early, but at most this often.
+MISS_POLL_SECONDS = 1.0
+
+def normalize_name(text):
+    return " ".join(re.findall(r"[a-z0-9]+", (text or "").lower()))
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def similarity(query_grams, grams):
+    """Dice coefficient averaged with how much of the query is covered, so short queries still score well."""
+    shared = len(query_grams & grams)
+    return (2 * shared / (len(query_grams) + len(grams)) + shared / len(query_grams)) / 2
+
+class ProductResolver(IncrementalIndex):
+    """
+    Maps a free-text product name or SKU to inventory documents.
+
+    Product names are indexed by word, and the (much smaller) vocabulary
+    of words is indexed by trigram, so a misspelt word is matched to the
+    closest known words first and only products containing those words
+    are scored. Candidates are ranked by trigram similarity of the whole
+    name; exact name or SKU matches score 1.0.
+
+    Kept current as an IncrementalIndex, polling every
+    RESOLVER_POLL_SECONDS and reloading every RESOLVER_RELOAD_SECONDS
+    without the catalog cache; a lookup that matches nothing also checks
+    Mongo directly before giving up.
+    """
+
+    fields = {"name": 1, "sku": 1, "updated_at": 1}
+    description = "Product resolver"
+
+    def __init__(self, collection, catalog_cache=None):
+        super().__init__(
+            collection,
+            catalog_cache,
+            poll_interval=float(os.getenv("RESOLVER_POLL_SECONDS", 30)),
+            reload_interval=float(os.getenv("RESOLVER_RELOAD_SECONDS", 600)),
+        )
+        self.min_word_similarity = float(os.getenv("RESOLVER_MIN_WORD_SIMILARITY", 0.5))
+        # Vague queries ("belt") can match thousands of names; only the
+        # shortest ones are scored since they are the closest matches anyway.
+        self.max_candidates = int(os.getenv("RESOLVER_MAX_CANDIDATES", 500))
+        self._products = {}
+        self._names = defaultdict(set)
+        self._skus = {}
+        self._words = defaultdict(set)
+        self._word_grams = defaultdict(set)
+
+    def _reset(self):
+        self._products, self._skus = {}, {}
+        self._names, self._words, self._word_grams = defaultdict(set), defaultdict(set), defaultdict(set)
+
+    def _apply(self, product_id, doc):
+        current = self._products.get(product_id)
+        # Most changes are stock updates; leave the index alone for those.
+        if doc and current and current["name"] == doc.get("name") and current["sku"] == doc.get("sku"):
+            return
+        self._remove(product_id)
+        if doc:
+            self._add(product_id, doc)
+
+    def _add(self, product_id, doc):
+        name = doc.get("name") or ""
+        sku = doc.get("sku")
+        key = normalize_name(name)
+        self._products[product_id] = {"_id": product_id, "name": name, "sku": sku, "key": key}
+        self._names[key].add(product_id)
+        for word in set(key.split()):
+            if word not in self._words:
+                for gram in trigrams(word):
+                    self._word_grams[gram].add(word)
+            self._words[word].add(product_id)
+        if sku:
+            self._skus[sku.lower()] = product_id
+
+    def _remove(self, product_id):
+        product = self._products.pop(product_id, None)
+        if not product:
+            return
+        key = product["key"]
+        self._names[key].discard(product_id)
+        if not self._names[key]:
+            del self._names[key]
+        for word in set(key.split()):
+            ids = self._words.get(word)
+            if ids is None:
+                continue
+            ids.discard(product_id)
+            if not ids:
+                del self._words[word]
+                for gram in trigrams(word):
+                    self._word_grams[gram].discard(word)
+        if product["sku"] and self._skus.get(product["sku"].lower()) == product_id:
+            del self._skus[product["sku"].lower()]
+
+    def _similar_words(self, word):
+        if word in self._words:
+            return [word]
+        grams = trigrams(word)
+        known = set()
+        for gram in grams:
+            known.update(self._word_grams.get(gram, ()))
+        scored = sorted(((similarity(grams, trigrams(w)), w) for w in known), reverse=True)
+        return [w for score, w in scored[:3] if score >= self.min_word_similarity]
+
+    def resolve(self, text, limit=5):
+        """
+        Returns up to `limit` (score, product) pairs, best first.
+        Each product is a dict with _id, name and sku.
+        """
+        key = normalize_name(text)
+        if not key:
+            return []
+        with self._lock:
+            sku_match = self._skus.get(text.strip().lower())
+            if sku_match:
+                return [(1.0, self._public(sku_match))]
+
+            # Products containing a match for every query word; if no product
+            # has them all, fall back to the most selective word.
+            postings = []
+            for word in set(key.split()):
+                ids = set()
+                for similar in self._similar_words(word):
+                    ids |= self._words[similar]
+                if ids:
+                    postings.append(ids)
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:]) if postings else set()
+            if not candidates and postings:
+                candidates = postings[0]
+            names = {self._products[product_id]["key"] for product_id in candidates}
+            if len(names) > self.max_candidates:
+                names = heapq.nsmallest(self.max_candidates, names, key=lambda name: (len(name), name))
+            names = set(names)
+            names.add(key)
+
+            query_grams = trigrams(key)
+            scored = []
+            for name in names:
+                ids = self._names.get(name)
+                if not ids:
+                    continue
+                score = 1.0 if name == key else similarity(query_grams, trigrams(name))
+                scored.extend((score, product_id) for product_id in ids)
+            scored = heapq.nsmallest(limit, scored, key=lambda pair: (-pair[0], self._products[pair[1]]["name"], pair[1]))
+            return [(round(score, 3), self._public(product_id)) for score, product_id in scored]
+
+    def _public(self, product_id):
+        product = self._products[product_id]
+        return {"_id": product_id, "name": product["name"], "sku": product["sku"]}
+
+    def lookup(self, text):
+        """
+        Indexes products whose SKU or name is exactly `text` (ignoring case)
+        straight from Mongo; returns True if any were found. Used when the
+        index has no match, e.g. for a product inserted a moment ago.
+        """
+        text = text.strip()
+        if not text:
+            return False
+        name = re.compile(f"^{re.escape(text)}$", re.IGNORECASE)
+        docs = list(self.collection.find({"$or": [{"sku": text}, {"name": name}]}, self.fields).limit(10))
+        with self._lock:
+            for doc in docs:
+                self._apply(str(doc["_id"]), doc)
+        return bool(docs)
+
+    async def resolve_async(self, text, limit=5):
+        if self.needs_refresh:
+            await run_db(self.refresh)
+        candidates = self.resolve(text, limit)
+        if candidates and candidates[0][0] >= 1.0:
+            return candidates
+        # No exact match: the product may have been written by another process since the last poll.
+        if self.polling and time.monotonic() - self._polled_at >= MISS_POLL_SECONDS:
+            self._polled_at = 0.0
+            await run_db(self.refresh)
+            candidates = self.resolve(text, limit)
+        if not candidates and await run_db(self.lookup, text):
+            candidates = self.resolve(text, limit)
+        return candidates
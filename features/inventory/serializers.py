@@ -0,0 +1,48 @@
+import os
+
+# No image_url column: photos of the products named in a reply are sent by
+# core.media.ProductPhotoSender, and the system prompt tells the model never to
+# write image URLs. Change both together if images ever go back into the table.
+HEADER = "name | category | price | stock | sizes | about"
+
+def _line(product, description_chars):
+    category = "/".join(filter(None, [product.get("category"), product.get("subcategory")]))
+    description = (product.get("description") or "").strip()
+    if len(description) > description_chars:
+        description = description[:description_chars].rstrip() + "…"
+    return " | ".join([
+        product.get("name", ""),
+        category,
+        f"${product.get('price', 0):.2f}",
+        str(product.get("stock", 0)),
+        ",".join(str(size) for size in product.get("sizes") or []),
+        description,
+    ])
+
+def compact_products(products, token_budget=None, description_chars=None):
+    """
+    Renders products as a compact pipe-separated table for tool output.
+
+    Args:
+        products: Product documents (only listing fields are used).
+        token_budget: Approximate token cap for the whole table (4 chars per token).
+        description_chars: Maximum length of each product description.
+
+    Returns:
+        The table as a string; rows that do not fit the budget are counted
+        in a trailing note instead.
+    """
+    token_budget = token_budget or int(os.getenv("SEARCH_TOOL_TOKEN_BUDGET", 600))
+    description_chars = description_chars if description_chars is not None else int(os.getenv("SEARCH_TOOL_DESCRIPTION_CHARS", 60))
+    char_budget = token_budget * 4
+
+    lines = [HEADER]
+    used = len(HEADER)
+    for i, product in enumerate(products):
+        line = _line(product, description_chars)
+        if used + len(line) + 1 > char_budget and i > 0:
+            lines.append(f"(+{len(products) - i} more, narrow the search to see them)")
+            break
+        lines.append(line)
+        used += len(line) + 1
+    return "\n".join(lines)
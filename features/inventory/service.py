@@ -1,25 +1,113 @@
-
-from config.db import db
+import os
 import re
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, TEXT, UpdateOne
+from config.db import db, run_db
+from features.inventory.cache import get_catalog_cache
+
+TEXT_INDEX_NAME = "product_text"
+
+# Fields needed to list a product to a customer; everything else stays in Mongo.
+LISTING_FIELDS = ("name", "category", "subcategory", "price", "stock", "sizes", "description", "image_url")
+
+_change_listeners = []
+
+def normalize_category(category):
+    return category.strip().lower() if category else None
+
+def add_change_listener(callback):
+    """
+    Registers callback(changed_ids) for inventory changes: writes made by
+    this process and, when the catalog cache is enabled, writes seen by
+    its change feed. changed_ids is None when everything may have changed.
+    """
+    _change_listeners.append(callback)
+
+def notify_change(changed_ids):
+    for callback in _change_listeners:
+        try:
+            callback(changed_ids)
+        except Exception as e:
+            print(f"Inventory change listener failed: {e}")
 
 class InventoryService:
     def __init__(self):
         self.collection = db["inventory"]
+        # "text" uses the weighted text index; "regex" keeps the old
+        # substring behaviour (with escaped input) for small catalogs.
+        self.search_mode = os.getenv("INVENTORY_SEARCH_MODE", "text")
+        self.cache = get_catalog_cache(self.collection)
+        if self.cache:
+            self.cache.add_listener(notify_change)
+
+    def backfill_fields(self):
+        """
+        Adds category_key and updated_at to documents written before those
+        fields existed. Both filters scan the collection, so this runs from
+        the seeder and scripts/migrate_inventory.py, never at startup.
+        """
+        # Older documents only have the display category; derive the
+        # normalized key so category filters can be exact index matches.
+        self.collection.update_many(
+            {"category_key": {"$exists": False}, "category": {"$type": "string"}},
+            [{"$set": {"category_key": {"$toLower": {"$trim": {"input": "$category"}}}}}],
+        )
+        # The catalog cache polls on updated_at when change streams are unavailable.
+        self.collection.update_many(
+            {"updated_at": {"$exists": False}},
+            [{"$set": {"updated_at": {"$ifNull": ["$created_at", datetime.utcnow()]}}}],
+        )
+
+    def ensure_indexes(self):
+        self.collection.create_index(
+            [("name", TEXT), ("subcategory", TEXT), ("description", TEXT)],
+            weights={"name": 10, "subcategory": 5, "description": 1},
+            default_language="english",
+            name=TEXT_INDEX_NAME,
+        )
+        self.collection.create_index([("category_key", ASCENDING), ("price", ASCENDING)])
+        self.collection.create_index([("price", ASCENDING)])
+        self.collection.create_index([("updated_at", ASCENDING)])
+        self.collection.create_index([("reservations.id", ASCENDING)], sparse=True)
+        self.ensure_sku_index()
+
+    def ensure_sku_index(self):
+        # Bulk loads upsert on sku, so this one has to exist before a load.
+        self.collection.create_index(
+            [("sku", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"sku": {"$type": "string"}},
+        )
+
+    def start_cache(self):
+        if self.cache:
+            self.cache.start()
+
+    def search_products(self, query=None, category=None, min_price=None, max_price=None, limit=10, fields=LISTING_FIELDS):
+        if self.cache and self.cache.ready:
+            return self.cache.search(query, category, min_price, max_price, limit)
 
-    def search_products(self, query=None, category=None, min_price=None, max_price=None, limit=10):
         filter_query = {}
-        
+        projection = {field: 1 for field in fields} if fields else None
+        sort = None
+
         if query:
-            regex = re.compile(query, re.IGNORECASE)
-            filter_query["$or"] = [
-                {"name": regex},
-                {"description": regex},
-                {"subcategory": regex}
-            ]
-            
+            if self.search_mode == "regex":
+                regex = re.compile(re.escape(query), re.IGNORECASE)
+                filter_query["$or"] = [
+                    {"name": regex},
+                    {"description": regex},
+                    {"subcategory": regex}
+                ]
+            else:
+                filter_query["$text"] = {"$search": query}
+                projection = dict(projection or {}, score={"$meta": "textScore"})
+                sort = [("score", {"$meta": "textScore"})]
+
         if category:
-            filter_query["category"] = re.compile(category, re.IGNORECASE)
-            
+            filter_query["category_key"] = normalize_category(category)
+
         if min_price is not None or max_price is not None:
             price_query = {}
             if min_price is not None:
@@ -28,10 +116,166 @@ class InventoryService:
                 price_query["$lte"] = float(max_price)
             filter_query["price"] = price_query
 
-        cursor = self.collection.find(filter_query).limit(limit)
+        cursor = self.collection.find(filter_query, projection)
+        if sort:
+            cursor = cursor.sort(sort)
+        cursor = cursor.limit(limit)
+
         results = []
         for doc in cursor:
-            doc["_id"] = str(doc["_id"]) 
+            doc["_id"] = str(doc["_id"])
+            doc.pop("score", None)
             results.append(doc)
-            
+
         return results
+
+    def get_products(self, product_ids, fields=LISTING_FIELDS):
+        """Looks products up by ID, from the catalog cache when it is running."""
+        product_ids = [str(product_id) for product_id in product_ids]
+        if self.cache and self.cache.ready:
+            products = {product_id: self.cache.get(product_id) for product_id in product_ids}
+            return {product_id: doc for product_id, doc in products.items() if doc}
+        projection = {field: 1 for field in fields} if fields else None
+        products = {}
+        for doc in self.collection.find({"_id": {"$in": [ObjectId(product_id) for product_id in product_ids]}}, projection):
+            doc["_id"] = str(doc["_id"])
+            products[doc["_id"]] = doc
+        return products
+
+    def set_telegram_file_ids(self, file_ids):
+        """
+        Stores Telegram file_ids for product photos ({product_id: (file_id, image_url)}).
+        updated_at is left alone: a new file_id is not a catalog change, so
+        read them back with `get_telegram_file_ids()`, not the catalog cache.
+        """
+        # Plain updates rather than bulk_write: only a handful of new ids arrive per
+        # reply, and mongomock (used by the benchmarks) rejects UpdateOne in bulk_write.
+        for product_id, (file_id, image_url) in file_ids.items():
+            self.collection.update_one(
+                {"_id": ObjectId(product_id)},
+                {"$set": {"telegram_file_id": file_id, "telegram_file_source": image_url}},
+            )
+
+    def get_telegram_file_ids(self, product_ids):
+        """
+        Reads stored photo file_ids straight from Mongo, bypassing the catalog
+        cache, which would not see ids stored by other workers until its next
+        full reload. Returns {product_id: doc} with image_url, telegram_file_id
+        and telegram_file_source.
+        """
+        ids = [ObjectId(product_id) for product_id in product_ids]
+        products = {}
+        for doc in self.collection.find({"_id": {"$in": ids}}, {"image_url": 1, "telegram_file_id": 1, "telegram_file_source": 1}):
+            doc["_id"] = str(doc["_id"])
+            products[doc["_id"]] = doc
+        return products
+
+    def get_stock(self, product_id):
+        """Reads the current stock straight from Mongo, bypassing the catalog cache."""
+        doc = self.collection.find_one({"_id": ObjectId(product_id)}, {"stock": 1})
+        return doc.get("stock", 0) if doc else 0
+
+    def reserve_many(self, items, reservation_id):
+        """
+        Takes stock for several products in one unordered bulk write.
+
+        Every decrement is tagged with `reservation_id` so that it can be
+        undone with `release_reservation()` or confirmed with
+        `commit_reservation()`. Either all items are reserved, or none are.
+
+        Args:
+            items: List of dicts with product_id and quantity, at most one per product.
+            reservation_id: Unique ID for this checkout.
+
+        Returns:
+            The reserved products ({_id: product}), with name, category, price and image_url.
+
+        Raises:
+            ValueError: Listing the products that did not have enough stock.
+        """
+        now = datetime.utcnow()
+        requests = [
+            UpdateOne(
+                {"_id": ObjectId(item["product_id"]), "stock": {"$gte": item["quantity"]}, "reservations.id": {"$ne": reservation_id}},
+                {
+                    "$inc": {"stock": -item["quantity"]},
+                    "$push": {"reservations": {"id": reservation_id, "quantity": item["quantity"], "at": now}},
+                    "$set": {"updated_at": now},
+                },
+            )
+            for item in items
+        ]
+        self.collection.bulk_write(requests, ordered=False)
+
+        ids = [ObjectId(item["product_id"]) for item in items]
+        products = {
+            str(doc["_id"]): doc
+            for doc in self.collection.find({"_id": {"$in": ids}}, {"name": 1, "category": 1, "price": 1, "stock": 1, "image_url": 1, "reservations": 1})
+        }
+        short = []
+        for item in items:
+            product = products.get(str(item["product_id"]))
+            if not product or not any(r["id"] == reservation_id for r in product.get("reservations", [])):
+                available = product.get("stock", 0) if product else 0
+                short.append(f"{item.get('name') or item['product_id']} (available: {available})")
+        if short:
+            self.release_reservation(reservation_id)
+            raise ValueError("Insufficient stock for " + ", ".join(short) + ".")
+
+        for product_id, product in products.items():
+            product["_id"] = product_id
+            product.pop("reservations", None)
+        notify_change(list(products))
+        return products
+
+    def release_reservation(self, reservation_id):
+        """Puts back all stock taken under reservation_id."""
+        docs = list(self.collection.find({"reservations.id": reservation_id}, {"reservations.$": 1}))
+        if not docs:
+            return
+        now = datetime.utcnow()
+        self.collection.bulk_write([
+            UpdateOne(
+                {"_id": doc["_id"], "reservations.id": reservation_id},
+                {
+                    "$inc": {"stock": doc["reservations"][0]["quantity"]},
+                    "$pull": {"reservations": {"id": reservation_id}},
+                    "$set": {"updated_at": now},
+                },
+            )
+            for doc in docs
+        ], ordered=False)
+        notify_change([str(doc["_id"]) for doc in docs])
+
+    def commit_reservation(self, reservation_id):
+        """Drops the reservation tags once the order exists; the stock stays taken."""
+        self.collection.update_many(
+            {"reservations.id": reservation_id},
+            {"$pull": {"reservations": {"id": reservation_id}}},
+        )
+
+    def pending_reservations(self, older_than):
+        """IDs of reservations made before `older_than` that were never committed or released."""
+        # Match the unwound entries, not the documents: a product can hold an old reservation next to one still in flight.
+        return [doc["_id"] for doc in self.collection.aggregate([
+            {"$match": {"reservations.at": {"$lt": older_than}}},
+            {"$unwind": "$reservations"},
+            {"$match": {"reservations.at": {"$lt": older_than}}},
+            {"$group": {"_id": "$reservations.id"}},
+        ])]
+
+    async def search_products_async(self, query=None, category=None, min_price=None, max_price=None, limit=10, fields=LISTING_FIELDS):
+        # Cached searches run off the event loop too: they wait for the cache lock and scan every match of a query.
+        return await run_db(self.search_products, query, category, min_price, max_price, limit, fields)
+
+    async def get_stock_async(self, product_id):
+        return await run_db(self.get_stock, product_id)
+
+    async def get_products_async(self, product_ids, fields=LISTING_FIELDS):
+        return await run_db(self.get_products, product_ids, fields)
+
+    async def get_telegram_file_ids_async(self, product_ids):
+        return await run_db(self.get_telegram_file_ids, product_ids)
+
+    async def set_telegram_file_ids_async(self, file_ids):
+        return await run_db(self.set_telegram_file_ids, file_ids)
@@ -0,0 +1,49 @@
+import json
+from datetime import datetime
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import message_to_dict, messages_from_dict
+from config.db import db, run_db
+
+COLLECTION_NAME = "chat_history"
+
+class ChatHistoryStore(BaseChatMessageHistory):
+    """
+    Chat history for one session, stored on the shared pooled client.
+
+    Documents keep the `SessionId`/`History` layout used by
+    langchain_mongodb, plus a `created_at` timestamp.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.collection = db[COLLECTION_NAME]
+
+    @staticmethod
+    def ensure_indexes():
+        collection = db[COLLECTION_NAME]
+        collection.create_index([("SessionId", 1), ("_id", -1)])
+        collection.create_index([("SessionId", 1), ("created_at", -1)])
+
+    @property
+    def messages(self):
+        cursor = self.collection.find({"SessionId": self.session_id}, {"History": 1}).sort("_id", 1)
+        return messages_from_dict([json.loads(doc["History"]) for doc in cursor])
+
+    def add_messages(self, messages):
+        now = datetime.utcnow()
+        docs = [
+            {
+                "SessionId": self.session_id,
+                "History": json.dumps(message_to_dict(message)),
+                "created_at": now,
+            }
+            for message in messages
+        ]
+        if docs:
+            self.collection.insert_many(docs)
+
+    async def aadd_messages(self, messages):
+        await run_db(self.add_messages, messages)
+
+    def clear(self):
+        self.collection.delete_many({"SessionId": self.session_id})
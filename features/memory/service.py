@@ -0,0 +1,195 @@
+import os
+import json
+import asyncio
+from datetime import datetime
+from langchain_core.messages import HumanMessage, ToolMessage, messages_from_dict
+from pymongo.errors import DuplicateKeyError
+from config.db import db, run_db
+from features.memory.history import COLLECTION_NAME
+
+_fold_tasks = set()
+
+
+def estimate_tokens(message):
+    content = message.content
+    if not isinstance(content, str):
+        content = json.dumps(content, default=str)
+    size = len(content)
+    for call in getattr(message, "tool_calls", None) or []:
+        size += len(json.dumps(call.get("args", {}), default=str))
+    return size // 4 + 4
+
+
+class ConversationMemory:
+    """
+    Bounded view over a session's chat history.
+
+    Only the most recent turns are fetched (projected, sorted and limited on
+    the indexed SessionId/_id pair). Turns that fall out of the window are
+    folded into a rolling summary stored per session, so the cost of a turn
+    does not depend on how long the chat has been running.
+    """
+
+    def __init__(self, summarizer=None):
+        self.messages_collection = db[COLLECTION_NAME]
+        self.summaries_collection = db["chat_summaries"]
+        self.summarizer = summarizer
+        self.max_turns = int(os.getenv("MEMORY_MAX_TURNS", 6))
+        self.max_tokens = int(os.getenv("MEMORY_MAX_TOKENS", 2000))
+        self.fetch_limit = int(os.getenv("MEMORY_FETCH_LIMIT", 40))
+        self.fold_threshold = int(os.getenv("MEMORY_FOLD_THRESHOLD", 8))
+        self.fold_batch = int(os.getenv("MEMORY_FOLD_BATCH", 40))
+        self.tool_result_chars = int(os.getenv("MEMORY_TOOL_RESULT_CHARS", 200))
+        self.summary_chars = int(os.getenv("MEMORY_SUMMARY_CHARS", 1500))
+        self._folding = set()
+
+    def ensure_indexes(self):
+        self.summaries_collection.create_index("SessionId", unique=True)
+
+    async def load(self, session_id: str):
+        """
+        Returns the messages to replay for the next turn of a session.
+
+        Args:
+            session_id: The chat session identifier.
+
+        Returns:
+            A list of messages: an optional summary message followed by the
+            most recent turns, trimmed to the configured turn and token window.
+        """
+        summary_doc = await run_db(
+            self.summaries_collection.find_one,
+            {"SessionId": session_id},
+            {"summary": 1, "covered_until": 1},
+        )
+
+        filter_query = {"SessionId": session_id}
+        if summary_doc and summary_doc.get("covered_until"):
+            filter_query["_id"] = {"$gt": summary_doc["covered_until"]}
+
+        docs = await run_db(self._fetch, filter_query, -1, self.fetch_limit)
+        docs.reverse()
+
+        window_ids, window = self._select_window(docs)
+
+        overflow = len(docs) - len(window)
+        if window_ids and (overflow >= self.fold_threshold or len(docs) == self.fetch_limit):
+            self._schedule_fold(session_id, window_ids[0])
+
+        messages = []
+        if summary_doc and summary_doc.get("summary"):
+            messages.append(HumanMessage(
+                content=f"Summary of our conversation so far: {summary_doc['summary']}"
+            ))
+        messages.extend(window)
+        return messages
+
+    def _fetch(self, filter_query, direction, limit):
+        cursor = (
+            self.messages_collection.find(filter_query, {"History": 1})
+            .sort("_id", direction)
+            .limit(limit)
+        )
+        return list(cursor)
+
+    def _select_window(self, docs):
+        turns = []
+        for doc in docs:
+            message = messages_from_dict([json.loads(doc["History"])])[0]
+            if isinstance(message, HumanMessage):
+                turns.append([])
+            elif not turns:
+                # The window must start on a user turn, otherwise tool results
+                # would be replayed without the call that produced them.
+                continue
+            turns[-1].append((doc["_id"], self._trim(message)))
+
+        kept = []
+        budget = self.max_tokens
+        for turn in reversed(turns[-self.max_turns:]):
+            cost = sum(estimate_tokens(m) for _, m in turn)
+            if kept and cost > budget:
+                break
+            kept.insert(0, turn)
+            budget -= cost
+
+        pairs = [pair for turn in kept for pair in turn]
+        return [i for i, _ in pairs], [m for _, m in pairs]
+
+    def _trim(self, message):
+        if isinstance(message, ToolMessage) and isinstance(message.content, str):
+            if len(message.content) > self.tool_result_chars:
+                return message.model_copy(update={
+                    "content": message.content[:self.tool_result_chars]
+                    + " ...[truncated, call the tool again for full details]"
+                })
+        return message
+
+    def _schedule_fold(self, session_id, window_start_id):
+        if session_id in self._folding:
+            return
+        self._folding.add(session_id)
+        task = asyncio.get_running_loop().create_task(self.fold(session_id, window_start_id))
+        # The loop only keeps weak references to tasks; hold one until the fold finishes.
+        _fold_tasks.add(task)
+        task.add_done_callback(_fold_tasks.discard)
+        task.add_done_callback(lambda _: self._folding.discard(session_id))
+
+    async def fold(self, session_id: str, window_start_id):
+        """
+        Folds the oldest unsummarized messages before the window into the
+        session summary. At most `fold_batch` messages are read per call.
+        """
+        summary_doc = await run_db(self.summaries_collection.find_one, {"SessionId": session_id}) or {}
+        covered_until = summary_doc.get("covered_until")
+
+        id_query = {"$lt": window_start_id}
+        if covered_until:
+            id_query["$gt"] = covered_until
+
+        docs = await run_db(self._fetch, {"SessionId": session_id, "_id": id_query}, 1, self.fold_batch)
+        if not docs:
+            return
+
+        messages = messages_from_dict([json.loads(doc["History"]) for doc in docs])
+        previous = summary_doc.get("summary", "")
+        try:
+            if self.summarizer:
+                summary = await self.summarizer(previous, messages)
+            else:
+                summary = self._extractive_summary(previous, messages)
+        except Exception as e:
+            print(f"Memory fold failed for session {session_id}: {e}")
+            summary = self._extractive_summary(previous, messages)
+
+        try:
+            await run_db(
+                self.summaries_collection.update_one,
+                {"SessionId": session_id, "covered_until": covered_until},
+                {"$set": {
+                    "summary": summary[-self.summary_chars:],
+                    "covered_until": docs[-1]["_id"],
+                    "updated_at": datetime.utcnow(),
+                }},
+                upsert=covered_until is None,
+            )
+        except DuplicateKeyError:
+            # Another worker folded this session concurrently; keep theirs.
+            pass
+
+    def _extractive_summary(self, previous, messages):
+        lines = [previous] if previous else []
+        for message in messages:
+            if isinstance(message, HumanMessage) and isinstance(message.content, str):
+                lines.append(f"User: {message.content[:200]}")
+        return "\n".join(lines)
+
+
+def render_transcript(messages):
+    lines = []
+    for message in messages:
+        if isinstance(message, ToolMessage) or not isinstance(message.content, str) or not message.content:
+            continue
+        speaker = "User" if isinstance(message, HumanMessage) else "Assistant"
+        lines.append(f"{speaker}: {message.content}")
+    return "\n".join(lines)
@@ -0,0 +1,240 @@
+import os
+import uuid
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+from config.db import db, run_db
+from features.notifications.service import EmailService
+from core.metrics import span
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+
+def is_permanent(error):
+    """SMTP 5xx replies and refused recipients will not succeed on retry."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(error, smtplib.SMTPResponseException) and 500 <= error.smtp_code < 600
+
+class SMTPConnectionPool:
+    """Keeps authenticated SMTP connections open for reuse across sends."""
+
+    def __init__(self, email_service, size):
+        self.email_service = email_service
+        self.size = size
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                server = self._idle.pop() if self._idle else None
+            if server is None:
+                return self.email_service.connect()
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close(server)
+
+    def release(self, server, broken=False):
+        if broken:
+            self._close(server)
+            return
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(server)
+                return
+        self._close(server)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server in idle:
+            self._close(server)
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+class EmailQueue:
+    """
+    Persistent outbox for transactional email.
+
+    Checkout only inserts a job document. Worker threads claim jobs in
+    batches with an expiring lease, send each batch over a pooled SMTP
+    connection and retry failures with exponential backoff. Jobs left in
+    `sending` by a crashed worker are picked up again once their lease
+    expires.
+    """
+
+    def __init__(self, email_service=None):
+        self.collection = db["email_jobs"]
+        self.email_service = email_service or EmailService()
+        self.workers = int(os.getenv("EMAIL_WORKERS", 2))
+        self.batch_size = int(os.getenv("EMAIL_BATCH_SIZE", 20))
+        self.max_attempts = int(os.getenv("EMAIL_MAX_ATTEMPTS", 5))
+        self.backoff_seconds = float(os.getenv("EMAIL_BACKOFF_SECONDS", 30))
+        self.max_backoff_seconds = float(os.getenv("EMAIL_MAX_BACKOFF_SECONDS", 3600))
+        self.lease_seconds = float(os.getenv("EMAIL_LEASE_SECONDS", 120))
+        self.poll_interval = float(os.getenv("EMAIL_POLL_SECONDS", 2))
+        self.pool = SMTPConnectionPool(self.email_service, size=self.workers)
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def ensure_indexes(self):
+        self.collection.create_index([("status", ASCENDING), ("next_attempt_at", ASCENDING)])
+        self.collection.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+        self.collection.create_index(
+            "sent_at",
+            expireAfterSeconds=int(os.getenv("EMAIL_JOB_RETENTION_DAYS", 7)) * 86400,
+        )
+
+    def enqueue_order_confirmation(self, to_email: str, order: dict):
+        """
+        Queues an order confirmation email.
+
+        Args:
+            to_email: Recipient address.
+            order: The order document to render into the email.
+
+        Returns:
+            The job ID.
+        """
+        now = datetime.utcnow()
+        order = {k: v for k, v in order.items() if k != "_id"}
+        result = self.collection.insert_one({
+            "kind": "order_confirmation",
+            "to": to_email,
+            "order": order,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+        self._wakeup.set()
+        return result.inserted_id
+
+    async def enqueue_order_confirmation_async(self, to_email: str, order: dict):
+        return await run_db(self.enqueue_order_confirmation, to_email, order)
+
+    def start(self):
+        if self._threads or self.workers < 1:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(f"email-{i}-{uuid.uuid4().hex[:6]}",), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self.pool.close_all()
+
+    def _run(self, worker_id):
+        while not self._stop.is_set():
+            try:
+                jobs = self._claim_batch(worker_id)
+                if jobs:
+                    self._send_batch(jobs)
+                    continue
+            except Exception as e:
+                print(f"Email worker {worker_id} error: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _claim_batch(self, worker_id):
+        jobs = []
+        while len(jobs) < self.batch_size:
+            now = datetime.utcnow()
+            job = self.collection.find_one_and_update(
+                {"$or": [
+                    {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                    {"status": SENDING, "lease_until": {"$lt": now}},
+                ]},
+                {
+                    "$set": {"status": SENDING, "worker": worker_id, "lease_until": now + timedelta(seconds=self.lease_seconds)},
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("next_attempt_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if not job:
+                break
+            jobs.append(job)
+        return jobs
+
+    def _send_batch(self, jobs):
+        if not self.email_service.is_configured:
+            for job in jobs:
+                self.email_service.log_mock_email(self._build(job))
+                self._mark_sent(job)
+            return
+
+        server = None
+        for job in jobs:
+            # The batch lease was taken before the earlier sends; renew it so a slow
+            # SMTP server can't let another worker reclaim (and resend) this job.
+            if not self._renew_lease(job):
+                continue
+            try:
+                if server is None:
+                    server = self.pool.acquire()
+                msg = self._build(job)
+                with span("smtp_send"):
+                    server.sendmail(self.email_service.sender, job["to"], msg.as_string())
+                self._mark_sent(job)
+            except (smtplib.SMTPException, OSError) as e:
+                if not is_permanent(e) and server is not None:
+                    # The connection is suspect; drop it and reconnect for the next job.
+                    self.pool.release(server, broken=True)
+                    server = None
+                self._mark_failed(job, e, permanent=is_permanent(e))
+        if server is not None:
+            self.pool.release(server)
+
+    def _renew_lease(self, job):
+        """Extends the job's lease; returns False if another worker has reclaimed it."""
+        result = self.collection.update_one(
+            {"_id": job["_id"], "status": SENDING, "worker": job["worker"]},
+            {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+        )
+        return result.matched_count > 0
+
+    def _build(self, job):
+        return self.email_service.build_order_confirmation(job["to"], job["order"])
+
+    def _mark_sent(self, job):
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": SENT, "sent_at": now}, "$unset": {"lease_until": "", "last_error": ""}},
+        )
+
+    def _mark_failed(self, job, error, permanent=False):
+        print(f"❌ Failed to send email to {job['to']} (attempt {job['attempts']}): {error}")
+        if permanent or job["attempts"] >= self.max_attempts:
+            update = {"status": FAILED, "last_error": str(error)}
+        else:
+            delay = min(self.backoff_seconds * 2 ** (job["attempts"] - 1), self.max_backoff_seconds)
+            update = {
+                "status": PENDING,
+                "last_error": str(error),
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=delay),
+            }
+        self.collection.update_one({"_id": job["_id"]}, {"$set": update, "$unset": {"lease_until": ""}})
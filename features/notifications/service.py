@@ -12,6 +12,35 @@ class EmailService:
         self.smtp_port = int(os.getenv("SMTP_PORT", 587))
         self.smtp_username = os.getenv("SMTP_USERNAME")
         self.smtp_password = os.getenv("SMTP_PASSWORD")
+        self.smtp_use_tls = os.getenv("SMTP_USE_TLS", "true").lower() in ("1", "true", "yes")
+        self.sender = os.getenv("SMTP_FROM") or self.smtp_username or "no-reply@salesmate.local"
+
+    @property
+    def is_configured(self):
+        return bool(self.smtp_server)
+
+    def connect(self):
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.smtp_use_tls:
+            server.starttls()
+        if self.smtp_username and self.smtp_password:
+            server.login(self.smtp_username, self.smtp_password)
+        return server
+
+    def build_order_confirmation(self, to_email: str, order_details: dict):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = to_email
+        msg['Subject'] = f"Order Confirmation - Order #{order_details.get('order_id')}"
+        msg.attach(MIMEText(self._generate_html_content(order_details), 'html'))
+        return msg
+
+    def log_mock_email(self, msg):
+        print("WARNING: SMTP server not configured. Falling back to log.")
+        print(f"--- [MOCK EMAIL] To: {msg['To']} ---")
+        print(f"Subject: {msg['Subject']}")
+        print("Content: HTML Content Generated (Check code for layout)")
+        print("-------------------------------------")
 
     def _generate_html_content(self, order_details):
         items_html = ""
@@ -84,29 +113,16 @@ class EmailService:
         """
 
     def send_order_confirmation(self, to_email: str, order_details: dict):
-        subject = f"Order Confirmation - Order #{order_details.get('order_id')}"
-        html_content = self._generate_html_content(order_details)
+        msg = self.build_order_confirmation(to_email, order_details)
 
-        if not (self.smtp_server and self.smtp_username and self.smtp_password):
-            print("WARNING: SMTP credentials not found. Falling back to log.")
-            print(f"--- [MOCK EMAIL] To: {to_email} ---")
-            print(f"Subject: {subject}")
-            print("Content: HTML Content Generated (Check code for layout)")
-            print("-------------------------------------")
+        if not self.is_configured:
+            self.log_mock_email(msg)
             return True
 
-        msg = MIMEMultipart()
-        msg['From'] = self.smtp_username
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        msg.attach(MIMEText(html_content, 'html'))
-
         try:
             print(f"Connecting to {self.smtp_server}:{self.smtp_port}...")
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
-            server.sendmail(self.smtp_username, to_email, msg.as_string())
+            server = self.connect()
+            server.sendmail(self.sender, to_email, msg.as_string())
             server.quit()
             print(f"✅ Email sent successfully to {to_email}")
             return True
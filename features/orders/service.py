@@ -1,13 +1,50 @@
 
-from config.db import db
-from datetime import datetime
+from config.db import db, run_db
+from features.inventory.service import InventoryService
+from datetime import datetime, timedelta
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+import os
 import uuid
+import threading
+
+# Only what an order summary needs; payment ids, images and reservation tags stay in the database.
+HISTORY_FIELDS = {
+    "order_id": 1,
+    "created_at": 1,
+    "status": 1,
+    "total_amount": 1,
+    "items.name": 1,
+    "items.quantity": 1,
+    "items.price": 1,
+}
+
+def encode_cursor(order):
+    return f"{order['created_at'].isoformat()}_{order['_id']}"
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, order_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(created_at), ObjectId(order_id)
+    except (ValueError, InvalidId):
+        raise ValueError("Invalid page cursor")
 
 class OrderService:
-    def __init__(self):
+    def __init__(self, inventory_service=None):
         self.collection = db["orders"]
+        self.inventory_service = inventory_service or InventoryService()
+        self.recovery_interval = float(os.getenv("CHECKOUT_RECOVERY_SECONDS", 60))
+        self._stop = threading.Event()
+        self._thread = None
 
-    def create_order(self, user_id: str, items: list, total_amount: float, status: str = "paid"):
+    def ensure_indexes(self):
+        self.collection.create_index("reservation_id", sparse=True)
+        # Serves order history newest first; _id breaks ties between orders placed in the same millisecond.
+        self.collection.create_index([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)])
+
+    def create_order(self, user_id: str, items: list, total_amount: float, status: str = "paid", reservation_id: str = None):
         """
         Creates a new order in the database.
         
@@ -29,7 +66,167 @@ class OrderService:
             "created_at": datetime.utcnow(),
             "payment_id": f"pay_{uuid.uuid4().hex[:12]}"
         }
+        if reservation_id:
+            order["reservation_id"] = reservation_id
         
         result = self.collection.insert_one(order)
         order["_id"] = result.inserted_id
         return order
+
+    def place_order(self, user_id: str, product_id: str, quantity: int = 1):
+        """
+        Reserves stock for a single product and creates the order for it.
+
+        This is a one-line checkout, so the stock is taken under a
+        reservation tag and a crash before the order is written is undone
+        by `recover_reservations()`.
+
+        Args:
+            user_id: The ID of the user placing the order.
+            product_id: The inventory document ID of the product.
+            quantity: The number of units to buy.
+
+        Returns:
+            The newly created order document.
+
+        Raises:
+            ValueError: If the quantity is invalid or there is not enough stock.
+        """
+        return self.checkout(user_id, [{"product_id": product_id, "quantity": quantity}])
+
+    def checkout(self, user_id: str, items: list):
+        """
+        Buys several products as one order.
+
+        All items are reserved in a single bulk write tagged with a
+        reservation ID. If any item is short, or the order cannot be
+        written, every reservation is released again.
+
+        Args:
+            user_id: The ID of the user placing the order.
+            items: List of dicts with product_id, quantity and optionally name; lines for the same product are merged.
+
+        Returns:
+            The newly created order document.
+
+        Raises:
+            ValueError: If the list is empty, a quantity is invalid or stock is insufficient.
+        """
+        if not items:
+            raise ValueError("There is nothing to check out.")
+        if any(item["quantity"] < 1 for item in items):
+            raise ValueError("Quantity must be at least 1.")
+
+        # A product on several lines is reserved and ordered once, for the summed quantity.
+        merged = {}
+        for item in items:
+            key = str(item["product_id"])
+            if key in merged:
+                merged[key]["quantity"] += item["quantity"]
+            else:
+                merged[key] = dict(item)
+        items = list(merged.values())
+
+        reservation_id = uuid.uuid4().hex
+        products = self.inventory_service.reserve_many(items, reservation_id)
+        order_items = []
+        for item in items:
+            product = products[str(item["product_id"])]
+            order_items.append({
+                "product_id": product["_id"],
+                "name": product["name"],
+                "category": product.get("category"),
+                "quantity": item["quantity"],
+                "price": product.get("price", 0),
+                "image_url": product.get("image_url")
+            })
+        total_amount = round(sum(item["price"] * item["quantity"] for item in order_items), 2)
+
+        try:
+            order = self.create_order(user_id, order_items, total_amount, reservation_id=reservation_id)
+        except Exception:
+            self.inventory_service.release_reservation(reservation_id)
+            raise
+        self.inventory_service.commit_reservation(reservation_id)
+        return order
+
+    def recover_reservations(self, older_than_seconds=None):
+        """
+        Settles checkouts interrupted between reserving stock and finishing:
+        reservations that made it into an order are committed, the rest
+        are released.
+        """
+        older_than_seconds = older_than_seconds or float(os.getenv("CHECKOUT_RESERVATION_TIMEOUT_SECONDS", 300))
+        cutoff = datetime.utcnow() - timedelta(seconds=older_than_seconds)
+        for reservation_id in self.inventory_service.pending_reservations(cutoff):
+            if self.collection.find_one({"reservation_id": reservation_id}, {"_id": 1}):
+                self.inventory_service.commit_reservation(reservation_id)
+            else:
+                print(f"Releasing abandoned stock reservation {reservation_id}")
+                self.inventory_service.release_reservation(reservation_id)
+
+    def start(self):
+        """Settles interrupted checkouts every CHECKOUT_RECOVERY_SECONDS on a background thread."""
+        if self._thread or self.recovery_interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._run, name="checkout-recovery", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.recover_reservations()
+            except PyMongoError as e:
+                print(f"Checkout recovery failed: {e}")
+            self._stop.wait(self.recovery_interval)
+
+    def get_order_history(self, user_id: str, limit: int = 5, cursor: str = None, since: datetime = None):
+        """
+        Returns one page of a user's orders, newest first.
+
+        Pages are addressed by a cursor (the created_at and _id of the last
+        order on the previous page) instead of skip, so every page is a
+        bounded walk of the (user_id, created_at, _id) index no matter how
+        many orders the user has.
+
+        Args:
+            user_id: The ID the orders were placed under.
+            limit: The maximum number of orders to return.
+            cursor: The next_cursor of the previous page, if any.
+            since: Only return orders placed at or after this time.
+
+        Returns:
+            A tuple (orders, next_cursor); next_cursor is None on the last page.
+        """
+        query = {"user_id": user_id}
+        if since:
+            query["created_at"] = {"$gte": since}
+        if cursor:
+            created_at, order_id = decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": order_id}},
+            ]
+
+        orders = list(
+            self.collection.find(query, HISTORY_FIELDS)
+            .sort([("created_at", DESCENDING), ("_id", DESCENDING)])
+            .limit(limit + 1)
+        )
+        next_cursor = encode_cursor(orders[limit - 1]) if len(orders) > limit else None
+        return orders[:limit], next_cursor
+
+    async def create_order_async(self, user_id: str, items: list, total_amount: float, status: str = "paid"):
+        return await run_db(self.create_order, user_id, items, total_amount, status)
+
+    async def place_order_async(self, user_id: str, product_id: str, quantity: int = 1):
+        return await run_db(self.place_order, user_id, product_id, quantity)
+
+    async def checkout_async(self, user_id: str, items: list):
+        return await run_db(self.checkout, user_id, items)
+
+    async def get_order_history_async(self, user_id: str, limit: int = 5, cursor: str = None, since: datetime = None):
+        return await run_db(self.get_order_history, user_id, limit, cursor, since)
@@ -1,37 +1,146 @@
-
+import os
+import asyncio
+import threading
 import bcrypt
-from config.db import db
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from cachetools import TTLCache
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from config.db import db, run_db
 from features.users.models import User
 
+_hash_executor = None
+_hash_executor_lock = threading.Lock()
+
+# Authenticated users by telegram_chat_id, without password hashes.
+_session_cache = TTLCache(
+    maxsize=int(os.getenv("AUTH_SESSION_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("AUTH_SESSION_TTL_SECONDS", 900)),
+)
+_session_lock = threading.Lock()
+_NOT_FOUND = object()
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def check_password(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+def get_hash_executor():
+    """
+    Bounded pool for bcrypt work so hashing never runs on the event loop.
+    AUTH_HASH_POOL=process sidesteps the GIL entirely; the default thread
+    pool is enough because bcrypt releases the GIL while hashing.
+    """
+    global _hash_executor
+    with _hash_executor_lock:
+        if _hash_executor is None:
+            workers = int(os.getenv("AUTH_HASH_WORKERS", 2))
+            if os.getenv("AUTH_HASH_POOL", "thread") == "process":
+                _hash_executor = ProcessPoolExecutor(max_workers=workers)
+            else:
+                _hash_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        return _hash_executor
+
+async def run_hash(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_hash_executor(), func, *args)
+
 class AuthService:
     def __init__(self):
         self.collection = db["users"]
+        self.bcrypt_rounds = int(os.getenv("BCRYPT_ROUNDS", 12))
+
+    def ensure_indexes(self):
+        try:
+            self.collection.create_index("email", unique=True)
+            self.collection.create_index(
+                "telegram_chat_id",
+                unique=True,
+                partialFilterExpression={"telegram_chat_id": {"$type": "number"}},
+            )
+        except OperationFailure as e:
+            print(f"WARNING: Could not create unique user indexes (duplicate data?): {e}")
 
     def create_user(self, email, password, full_name, mobile_number, telegram_chat_id=None):
-        if self.collection.find_one({"email": email}):
+        if self.collection.find_one({"email": email}, {"_id": 1}):
+            raise ValueError("User already exists")
+
+        hashed_password = hash_password(password, self.bcrypt_rounds)
+        return self._insert_user(email, hashed_password, full_name, mobile_number, telegram_chat_id)
+
+    def _insert_user(self, email, hashed_password, full_name, mobile_number, telegram_chat_id):
+        if telegram_chat_id is not None:
+            self._release_telegram_id(email, telegram_chat_id)
+        user = User(email, hashed_password, full_name, mobile_number, telegram_chat_id)
+        try:
+            result = self.collection.insert_one(user.to_dict())
+        except DuplicateKeyError:
             raise ValueError("User already exists")
-        
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-        user = User(email, hashed_password.decode('utf-8'), full_name, mobile_number, telegram_chat_id)
-        
-        result = self.collection.insert_one(user.to_dict())
+        self._forget_session(telegram_chat_id)
         return result.inserted_id
 
     def authenticate_user(self, email, password):
         user_data = self.collection.find_one({"email": email})
         if not user_data:
             return False
-            
-        if bcrypt.checkpw(password.encode('utf-8'), user_data["password"].encode('utf-8')):
+
+        if check_password(password, user_data["password"]):
             return user_data
         return False
-        
+
     def link_telegram_id(self, email, telegram_chat_id):
+        # A chat belongs to one account at a time (unique index).
+        self._release_telegram_id(email, telegram_chat_id)
         result = self.collection.update_one(
             {"email": email},
             {"$set": {"telegram_chat_id": telegram_chat_id}}
         )
+        self._forget_session(telegram_chat_id)
         return result.modified_count > 0
 
+    def _release_telegram_id(self, email, telegram_chat_id):
+        self.collection.update_many(
+            {"telegram_chat_id": telegram_chat_id, "email": {"$ne": email}},
+            {"$unset": {"telegram_chat_id": ""}},
+        )
+
     def get_user_by_telegram_id(self, telegram_chat_id):
-        return self.collection.find_one({"telegram_chat_id": telegram_chat_id})
+        with _session_lock:
+            cached = _session_cache.get(telegram_chat_id)
+        if cached is not None:
+            return None if cached is _NOT_FOUND else dict(cached)
+
+        user = self.collection.find_one({"telegram_chat_id": telegram_chat_id}, {"password": 0})
+        with _session_lock:
+            _session_cache[telegram_chat_id] = user if user else _NOT_FOUND
+        return user
+
+    def _forget_session(self, telegram_chat_id):
+        with _session_lock:
+            _session_cache.pop(telegram_chat_id, None)
+
+    async def create_user_async(self, email, password, full_name, mobile_number, telegram_chat_id=None):
+        if await run_db(self.collection.find_one, {"email": email}, {"_id": 1}):
+            raise ValueError("User already exists")
+
+        hashed_password = await run_hash(hash_password, password, self.bcrypt_rounds)
+        return await run_db(self._insert_user, email, hashed_password, full_name, mobile_number, telegram_chat_id)
+
+    async def authenticate_user_async(self, email, password):
+        user_data = await run_db(self.collection.find_one, {"email": email})
+        if not user_data:
+            return False
+
+        if await run_hash(check_password, password, user_data["password"]):
+            return user_data
+        return False
+
+    async def link_telegram_id_async(self, email, telegram_chat_id):
+        return await run_db(self.link_telegram_id, email, telegram_chat_id)
+
+    async def get_user_by_telegram_id_async(self, telegram_chat_id):
+        with _session_lock:
+            cached = _session_cache.get(telegram_chat_id)
+        if cached is not None:
+            return None if cached is _NOT_FOUND else dict(cached)
+        return await run_db(self.get_user_by_telegram_id, telegram_chat_id)
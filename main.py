@@ -1,62 +1,132 @@
 import os
+import asyncio
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, ContextTypes, filters
-from langchain.agents import create_agent
-from features.users.service import AuthService
-from langchain_mongodb.chat_message_histories import MongoDBChatMessageHistory
-from langchain_core.messages import HumanMessage
-from config.db import client
-
-from tools.inventory_tools import search_inventory
-from tools.order_tools import buy_product
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+from features.memory.history import ChatHistoryStore
+from features.analytics.service import format_report
+from core.container import services
+from core.scheduler import ChatKeyedUpdateProcessor
+from core.webhook import serve_webhook
+from core import cache
+from core.streaming import StreamingReply
+from core.media import mentioned_products, remember_products, shown_products
+from core.admission import RATE_LIMITED_REPLY, ModelErrorTracker, Rejected, degraded_reply
+from core.metrics import AgentMetricsCallback, current_session, span, start_metrics_server
 
 load_dotenv()
 
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash-lite",
-    api_key=os.getenv("GEMINI_API_KEY"),
-)
-
-agent = create_agent(
-    model=model,
-    tools=[search_inventory, buy_product],
-    system_prompt="You are a helpful sales assistant for SalesMate, a fashion brand.\n"
-                  "You can check our inventory to answer user questions about products, prices, and availability.\n"
-                  "If a user asks about products, use the 'search_inventory' tool to find relevant items.\n" 
-                  "When displaying products, always include the product 'image_url' in your response as a markdown image.\n"
-                  "Be polite and professional and don't return response in markdown format just plain text, except for the image.\n"
-                  "IMPORTANT: Remember context from the conversation. If the user mentions their size, preferences, or other details, use that information to answer follow-up questions.\n"
-                  "SHOPPING: If a user wants to buy something, use the 'buy_product' tool. YOU MUST ask for their email address if it's not already known before confirming the purchase.",
-)
+ADMIN_CHAT_IDS = {int(chat_id) for chat_id in os.getenv("ADMIN_CHAT_IDS", "").split(",") if chat_id.strip()}
 
 def get_session_history(session_id: str):
-    return MongoDBChatMessageHistory(
-        session_id=session_id,
-        connection_string=os.getenv("MONGODB_URL"),
-        database_name="salesmate",
-        collection_name="chat_history",
-    )
+    return ChatHistoryStore(session_id)
+
+# Only runs that used these tools may be served from the first-turn response cache.
+CACHEABLE_TOOLS = {"search_inventory", "browse_catalog"}
+
+def is_cacheable_run(messages):
+    for message in messages:
+        for call in getattr(message, "tool_calls", None) or []:
+            if call["name"] not in CACHEABLE_TOOLS:
+                return False
+    return isinstance(messages[-1].content, str)
+
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+
+# The agent build started by on_startup, if any.
+_agent_ready = None
+
+INTERRUPTED_REPLY = "Sorry, something went wrong before I could finish my answer. This is what was done:"
+
+# `transcript` follows the messages produced so far, so a run that fails part-way still shows which tools finished.
+async def run_agent(input_messages, on_text=None, session_id=None, transcript=None):
+    # Tools that need the chat (the cart tools) read session_id from the config.
+    config = {"callbacks": [AgentMetricsCallback(), ModelErrorTracker()], "configurable": {"session_id": session_id}}
+    transcript = [] if transcript is None else transcript
+    transcript[:] = input_messages
+    streamed_id = None
+    streamed_text = ""
+    stream_mode = ["messages", "values"] if on_text else ["values"]
+    agent = await get_agent()
+    async for mode, chunk in agent.astream({"messages": input_messages}, config=config, stream_mode=stream_mode):
+        if mode == "values":
+            transcript[:] = chunk["messages"]
+            continue
+        token, _ = chunk
+        if not isinstance(token, AIMessageChunk) or not token.text:
+            continue
+        # Each model call in the agent loop is a new message; only show the latest one.
+        if token.id != streamed_id:
+            streamed_id = token.id
+            streamed_text = ""
+        streamed_text += token.text
+        await on_text(streamed_text)
+    return list(transcript)
 
-async def process_chat(session_id: str, user_text: str):
+# Results of the tools that are not plain catalog lookups: orders, carts and order history.
+def completed_actions(messages):
+    return [str(message.content) for message in messages if isinstance(message, ToolMessage) and message.name not in CACHEABLE_TOOLS]
+
+async def process_chat(session_id: str, user_text: str, on_text=None):
+    current_session.set(session_id)
     history = get_session_history(session_id)
-    current_messages = history.messages
+    with span("history_load"):
+        current_messages = await services.memory.load(session_id)
     
     user_msg = HumanMessage(content=user_text)
+
+    cache_key = None
+    response_cache = services.response_cache
+    if response_cache and not current_messages:
+        cache_key = response_cache.make_key(user_text)
+        cached = await response_cache.aget(cache_key)
+        if cached is not None:
+            # The cached reply keeps the ids of the products its tools returned, so their photos are still sent.
+            if cached["product_ids"]:
+                products = await services.inventory_service.get_products_async(cached["product_ids"])
+                remember_products([products[product_id] for product_id in cached["product_ids"] if product_id in products])
+            with span("history_write"):
+                await history.aadd_messages([user_msg, AIMessage(content=cached["text"])])
+            return cached["text"]
     
     input_messages = current_messages + [user_msg]
+    transcript = []
     
-    response = await agent.ainvoke({"messages": input_messages})
-    
-    all_messages = response["messages"]
+    with span("agent", streaming=on_text is not None):
+        try:
+            all_messages = await services.admission.run(session_id, lambda: run_agent(input_messages, on_text, session_id, transcript))
+        except Rejected as e:
+            partial = transcript[len(current_messages):]
+            actions = completed_actions(partial)
+            if not actions:
+                # Degraded answers are not written to history, so the model never sees them as its own replies.
+                return await fallback_reply(e.reason, user_text)
+            # A tool already did its work (e.g. an order was placed): keep it in history and tell the customer.
+            reply = INTERRUPTED_REPLY + "\n\n" + "\n\n".join(actions)
+            with span("history_write", messages=len(partial) + 1):
+                await history.aadd_messages(partial + [AIMessage(content=reply)])
+            return reply
     
     new_messages = all_messages[len(current_messages):]
     
-    await history.aadd_messages(new_messages)
+    with span("history_write", messages=len(new_messages)):
+        await history.aadd_messages(new_messages)
+
+    if cache_key and is_cacheable_run(new_messages):
+        product_ids = list(dict.fromkeys(str(product["_id"]) for product in shown_products.get() or []))
+        await response_cache.aset(cache_key, {"text": all_messages[-1].content, "product_ids": product_ids})
     
     return all_messages[-1].content
 
+async def fallback_reply(reason, user_text):
+    if reason == "rate_limited":
+        return RATE_LIMITED_REPLY
+    with span("fallback", reason=reason):
+        reply, products = await degraded_reply(services.inventory_service, user_text)
+    remember_products(products)
+    return reply
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     welcome_message = (
         "Welcome to SalesMate! 🛍️\n\n"
@@ -67,6 +137,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🛒 Shopping:\n"
         "- Ask me about our latest products (e.g., 'Show me men's t-shirts')\n"
         "- Check prices and availability\n"
+        "- Add several products to your cart and check out in one go\n"
         "- View product images\n\n"
         "ℹ️ Help:\n"
         "- /help - Show this menu again"
@@ -87,8 +158,6 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
     await update.message.reply_text(help_text)
 
-auth_service = AuthService()
-
 async def register(update: Update, context: ContextTypes.DEFAULT_TYPE):
     args = context.args
     
@@ -106,7 +175,7 @@ async def register(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     try:
-        user_id = auth_service.create_user(email, password, full_name, mobile_number, telegram_chat_id=update.effective_chat.id)
+        user_id = await services.auth_service.create_user_async(email, password, full_name, mobile_number, telegram_chat_id=update.effective_chat.id)
         await update.message.reply_text(f"Registration successful! User ID: {user_id}")
     except ValueError as e:
         await update.message.reply_text(str(e))
@@ -120,34 +189,125 @@ async def login(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
         
     email, password = args
-    user = auth_service.authenticate_user(email, password)
+    with span("auth"):
+        user = await services.auth_service.authenticate_user_async(email, password)
     if user:
-        auth_service.link_telegram_id(email, update.effective_chat.id)
+        await services.auth_service.link_telegram_id_async(email, update.effective_chat.id)
         await update.message.reply_text("Login successful!")
     else:
         await update.message.reply_text("Invalid email or password.")
 
-from langchain_core.messages import HumanMessage
+async def sales(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_chat.id not in ADMIN_CHAT_IDS:
+        await update.message.reply_text("This command is only available to administrators.")
+        return
+    try:
+        days = int(context.args[0]) if context.args else 7
+    except ValueError:
+        await update.message.reply_text("Usage: /sales [days]")
+        return
+
+    report = await services.sales_analytics.report_async(days=max(days, 1))
+    await update.message.reply_text(format_report(report))
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_text = update.message.text
     session_id = str(update.effective_chat.id)
 
+    current_session.set(session_id)
+    shown_products.set([])
+    with span("handle_message"):
+        response_content = await reply_to_message(update, session_id, user_text)
+        await send_product_photos(context.bot, update.effective_chat.id, response_content)
+
+async def reply_to_message(update: Update, session_id: str, user_text: str):
+    if STREAM_REPLIES:
+        reply = StreamingReply(update.message)
+        await reply.start()
+        response_content = await process_chat(session_id, user_text, on_text=reply.update)
+        with span("reply_send"):
+            await reply.finish(response_content)
+        return response_content
+
     response_content = await process_chat(session_id, user_text)
 
+    with span("reply_send"):
+        try:
+            await update.message.reply_text(response_content, parse_mode='Markdown')
+        except Exception:
+            await update.message.reply_text(response_content)
+    return response_content
+
+async def send_product_photos(bot, chat_id, response_content):
+    products = mentioned_products(response_content, shown_products.get() or [])
+    if not bot or not products:
+        return
     try:
-        await update.message.reply_text(response_content, parse_mode='Markdown')
-    except Exception:
-        await update.message.reply_text(response_content)
+        await services.photo_sender.send(bot, chat_id, products)
+    except Exception as e:
+        print(f"Could not send product photos to {chat_id}: {e}")
     
-if __name__ == "__main__":
-    app = ApplicationBuilder().token(os.getenv("TELEGRAM_BOT_TOKEN")).build()
+async def on_startup(app):
+    ChatHistoryStore.ensure_indexes()
+    inventory_service = services.inventory_service
+    inventory_service.ensure_indexes()
+    inventory_service.start_cache()
+    services.email_queue.ensure_indexes()
+    services.email_queue.start()
+    services.product_resolver.load()
+    services.facet_index.load()
+    services.cart_service.ensure_indexes()
+    services.order_service.ensure_indexes()
+    services.order_service.start()
+    services.memory.ensure_indexes()
+    cache.ensure_indexes()
+    services.auth_service.ensure_indexes()
+    services.sales_analytics.ensure_indexes()
+    services.sales_analytics.start()
+    start_metrics_server()
+    # Build the model and agent graph off the event loop so the first chat doesn't pay for it.
+    # The model reads its timeout from admission control, so that is built here on the loop first.
+    global _agent_ready
+    services.admission
+    _agent_ready = asyncio.get_running_loop().run_in_executor(None, lambda: services.agent)
+    _agent_ready.add_done_callback(log_warm_up_failure)
+
+def log_warm_up_failure(future):
+    if not future.cancelled() and future.exception():
+        print(f"Building the agent at startup failed: {future.exception()!r}")
+
+async def get_agent():
+    # Wait for the startup build instead of racing it; if that failed, building again raises here.
+    if _agent_ready is not None:
+        await asyncio.wait([_agent_ready])
+    return services.agent
+
+def build_application(**overrides):
+    """
+    Application factory. Services are built lazily on first use; pass
+    overrides (e.g. agent=..., inventory_service=...) to inject your own.
+    """
+    services.override(**overrides)
+    app = (
+        ApplicationBuilder()
+        .token(os.getenv("TELEGRAM_BOT_TOKEN"))
+        .concurrent_updates(ChatKeyedUpdateProcessor())
+        .post_init(on_startup)
+        .build()
+    )
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("register", register))
     app.add_handler(CommandHandler("login", login))
     app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("sales", sales))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    return app
 
-    print("Bot started. Polling...")
-    app.run_polling()
\ No newline at end of file
+if __name__ == "__main__":
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        serve_webhook("main:build_application")
+    else:
+        app = build_application()
+        print("Bot started. Polling...")
+        app.run_polling()
@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from features.inventory.service import InventoryService
+
+QUERIES = ["shirt", "denim", "jacket", "dress", "sneaker", "belt", "trousers"]
+
+async def chat(inventory_service, mode, chat_index, requests_per_chat, latencies):
+    for i in range(requests_per_chat):
+        query = QUERIES[(chat_index + i) % len(QUERIES)]
+        start = time.perf_counter()
+        if mode == "sync":
+            inventory_service.search_products(query)
+        else:
+            await inventory_service.search_products_async(query)
+        latencies.append(time.perf_counter() - start)
+        # Stand-in for the rest of the turn (LLM call, Telegram I/O).
+        await asyncio.sleep(0)
+
+async def run(mode, chats, requests_per_chat):
+    inventory_service = InventoryService()
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        chat(inventory_service, mode, c, requests_per_chat, latencies) for c in range(chats)
+    ))
+    elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+def report(mode, elapsed, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{mode:>5}: {len(latencies)} searches in {elapsed:.2f}s "
+        f"-> {len(latencies) / elapsed:.0f} ops/s, "
+        f"p50 {statistics.median(latencies) * 1000:.1f}ms, p95 {p95 * 1000:.1f}ms"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare blocking vs executor-backed Mongo access under concurrent chats.")
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"Benchmarking {args.chats} concurrent chats x {args.requests} searches against {os.getenv('MONGODB_URL')}")
+    for mode in ("sync", "async"):
+        elapsed, latencies = asyncio.run(run(mode, args.chats, args.requests))
+        report(mode, elapsed, latencies)
+
+if __name__ == "__main__":
+    main()
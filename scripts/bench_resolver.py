@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from config.db import db
+from features.inventory.resolver import ProductResolver
+
+def misspell(name, rng):
+    """Drops or swaps one character, like a hurried customer would."""
+    if len(name) < 4:
+        return name
+    i = rng.randrange(1, len(name) - 1)
+    if rng.random() < 0.5:
+        return name[:i] + name[i + 1:]
+    return name[:i - 1] + name[i] + name[i - 1] + name[i + 1:]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure product resolution latency against the current inventory.")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    resolver = ProductResolver(db["inventory"])
+    start = time.perf_counter()
+    resolver.load()
+    print(f"Index built in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(args.seed)
+    names = [doc["name"] for doc in db["inventory"].aggregate([{"$sample": {"size": 200}}, {"$project": {"name": 1}}])]
+    if not names:
+        print("Inventory is empty; run scripts/seed_inventory.py first.")
+        return
+
+    for label, make in (
+        ("exact", lambda name: name),
+        ("misspelt", lambda name: misspell(name, rng)),
+        ("partial", lambda name: " ".join(name.split()[-2:])),
+    ):
+        latencies = []
+        hits = 0
+        for _ in range(args.queries):
+            name = rng.choice(names)
+            query = make(name)
+            start = time.perf_counter()
+            candidates = resolver.resolve(query)
+            latencies.append(time.perf_counter() - start)
+            hits += bool(candidates) and candidates[0][1]["name"] == name
+        latencies.sort()
+        print(
+            f"{label:>9}: p50 {statistics.median(latencies) * 1000:.3f}ms  "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f}ms  "
+            f"top-1 {hits / args.queries:.0%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from config.db import db
+from core.media import Image, MEDIA_CACHE_DIR, build_thumbnail, thumbnail_path
+
+def main():
+    parser = argparse.ArgumentParser(description="Download and downscale product images into the local media cache.")
+    parser.add_argument("--workers", type=int, default=8, help="parallel downloads")
+    parser.add_argument("--force", action="store_true", help="rebuild thumbnails that already exist")
+    args = parser.parse_args()
+
+    if Image is None:
+        print("Pillow is not installed; images are cached at their original size.")
+
+    urls = {doc["image_url"] for doc in db["inventory"].find({"image_url": {"$type": "string"}}, {"image_url": 1})}
+    if args.force:
+        for url in urls:
+            thumbnail_path(url).unlink(missing_ok=True)
+    todo = [url for url in urls if not thumbnail_path(url).exists()]
+    print(f"{len(urls)} product images, {len(todo)} to fetch into {MEDIA_CACHE_DIR}/")
+
+    def fetch(url):
+        try:
+            build_thumbnail(url)
+            return True
+        except Exception as e:
+            print(f"  failed {url}: {e}")
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        built = sum(pool.map(fetch, todo))
+    print(f"Built {built}/{len(todo)} thumbnails in {time.perf_counter() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
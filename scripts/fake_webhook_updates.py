@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import time
+import argparse
+import urllib.request
+import urllib.error
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from core.webhook import SECRET_HEADER
+
+MESSAGES = ["hi", "Show me men's t-shirts", "Do you have jackets under $100?", "What sizes do you have?"]
+
+def fake_update(update_id, chat_id, text):
+    now = int(time.time())
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": now,
+            "chat": {"id": chat_id, "type": "private", "first_name": f"Load{chat_id}"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": f"Load{chat_id}"},
+            "text": text,
+        },
+    }
+
+def post(url, secret, update):
+    request = urllib.request.Request(url, data=json.dumps(update).encode(), method="POST")
+    request.add_header("Content-Type", "application/json")
+    if secret:
+        request.add_header(SECRET_HEADER, secret)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def main():
+    parser = argparse.ArgumentParser(description="Post fake Telegram updates to the webhook ingress.")
+    parser.add_argument("--url", default=f"http://localhost:{os.getenv('WEBHOOK_PORT', 8443)}{os.getenv('WEBHOOK_PATH', '/telegram')}")
+    parser.add_argument("--secret", default=os.getenv("WEBHOOK_SECRET"))
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--messages", type=int, default=5, help="messages per chat")
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    updates = []
+    update_id = int(time.time())
+    for i in range(args.messages):
+        for chat in range(args.chats):
+            update_id += 1
+            updates.append(fake_update(update_id, 900000000 + chat, MESSAGES[i % len(MESSAGES)]))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        statuses = Counter(pool.map(lambda u: post(args.url, args.secret, u), updates))
+    elapsed = time.perf_counter() - start
+
+    print(f"Posted {len(updates)} updates for {args.chats} chats in {elapsed:.2f}s ({len(updates) / elapsed:.0f}/s)")
+    print("Responses:", dict(statuses))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def measure(module, env):
+    """Imports module in a fresh interpreter with -X importtime; returns [(cumulative_us, self_us, depth, name)]."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, cwd=os.getcwd(),
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"Importing {module} failed.")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(cumulative_us), int(self_us), (len(indent) - 1) // 2, name))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that importing the bot stays within an import-time budget.")
+    parser.add_argument("--module", default="main", help="module to import")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", 1500)))
+    parser.add_argument("--top", type=int, default=15, help="slowest top-level imports to list")
+    parser.add_argument("--forbid", action="append", default=["langchain_google_genai", "langchain_mongodb", "langgraph"],
+                        help="packages that must not be imported eagerly (repeatable)")
+    args = parser.parse_args()
+
+    # No live config is needed: importing must not connect to anything.
+    env = dict(os.environ, MONGODB_URL=os.getenv("MONGODB_URL", "mongodb://127.0.0.1:1/"))
+    rows = measure(args.module, env)
+    total_ms = sum(cumulative for cumulative, _, depth, _ in rows if depth == 0) / 1000
+
+    print(f"import {args.module}: {total_ms:.0f}ms (budget {args.budget_ms:.0f}ms)")
+    for cumulative, self_us, _, name in sorted((r for r in rows if r[2] == 0), reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f}ms  {name}")
+
+    eager = sorted({name.split(".")[0] for _, _, _, name in rows} & set(args.forbid))
+    if eager:
+        print(f"Imported eagerly but should be lazy: {', '.join(eager)}")
+    if total_ms > args.budget_ms or eager:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import os
+import sys
+import time
+import argparse
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from features.inventory.service import InventoryService
+from features.inventory.serializers import compact_products
+
+SCENARIOS = [
+    {"query": "shirt"},
+    {"query": "leather"},
+    {"category": "Men"},
+    {"category": "Women", "max_price": 60},
+    {"min_price": 0},
+]
+
+def measure(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        output = fn()
+    return output, (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the old str(results) tool output with the compact serializer.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    service = InventoryService()
+    service.cache = None  # measure the Mongo path
+
+    print(f"{'scenario':<40} {'old tok':>8} {'new tok':>8} {'saved':>6} {'old ms':>8} {'new ms':>8}")
+    totals = [0, 0]
+    for scenario in SCENARIOS:
+        old, old_ms = measure(lambda: str(service.search_products(fields=None, **scenario)), args.repeat)
+        new, new_ms = measure(lambda: compact_products(service.search_products(**scenario)), args.repeat)
+        old_tokens, new_tokens = len(old) // 4, len(new) // 4
+        totals[0] += old_tokens
+        totals[1] += new_tokens
+        saved = 100 * (1 - new_tokens / old_tokens) if old_tokens else 0
+        print(f"{str(scenario):<40} {old_tokens:>8} {new_tokens:>8} {saved:>5.0f}% {old_ms:>8.2f} {new_ms:>8.2f}")
+
+    if totals[0]:
+        print(f"Total: {totals[0]} -> {totals[1]} tokens per set of tool calls ({100 * (1 - totals[1] / totals[0]):.0f}% fewer)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+import time
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from features.inventory.service import InventoryService
+
+def main():
+    inventory_service = InventoryService()
+    start = time.perf_counter()
+    inventory_service.backfill_fields()
+    print(f"Backfilled category_key and updated_at in {time.perf_counter() - start:.1f}s.")
+    inventory_service.ensure_indexes()
+    print("Inventory indexes are up to date.")
+
+if __name__ == "__main__":
+    main()
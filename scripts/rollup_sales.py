@@ -0,0 +1,29 @@
+import os
+import sys
+import time
+import argparse
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from features.analytics.service import SalesAnalytics, format_report
+
+def main():
+    parser = argparse.ArgumentParser(description="Bring the sales rollups up to date and print a report.")
+    parser.add_argument("--rebuild", action="store_true", help="drop the rollups and recompute them from all orders")
+    parser.add_argument("--days", type=int, default=7, help="days of daily revenue to print")
+    args = parser.parse_args()
+
+    analytics = SalesAnalytics()
+    start = time.perf_counter()
+    if args.rebuild:
+        analytics.rebuild()
+    else:
+        analytics.ensure_indexes()
+        if not analytics.refresh():
+            print("Another worker is refreshing the rollups; showing the last result.")
+    print(f"Rollups refreshed in {time.perf_counter() - start:.2f}s\n")
+    print(format_report(analytics.report(days=args.days)))
+
+if __name__ == "__main__":
+    main()
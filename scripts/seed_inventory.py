@@ -1,14 +1,182 @@
 
 import os
 import sys
+import csv
+import json
+import time
+import random
+import argparse
 from datetime import datetime
 
 # Add agent directory to sys.path to allow imports
 sys.path.append(os.path.join(os.getcwd()))
 
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 from config.db import db
+from features.inventory.service import InventoryService, normalize_category
 
-def seed_inventory():
+# Synthetic catalog: category -> subcategory -> (product nouns, price range, size run)
+APPAREL_SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+WAIST_SIZES = ["28", "30", "32", "34", "36", "38", "40"]
+SHOE_SIZES = ["36", "37", "38", "39", "40", "41", "42", "43", "44", "45"]
+KIDS_SIZES = ["2Y", "4Y", "6Y", "8Y", "10Y", "12Y"]
+ONE_SIZE = ["One Size"]
+
+CATALOG = {
+    "Men": {
+        "T-Shirts": (["T-Shirt", "Crew Neck Tee", "V-Neck Tee", "Henley"], (12, 45), APPAREL_SIZES),
+        "Shirts": (["Oxford Shirt", "Flannel Shirt", "Linen Shirt", "Dress Shirt"], (30, 90), APPAREL_SIZES),
+        "Jeans": (["Jeans", "Straight Leg Jeans", "Tapered Jeans"], (40, 120), WAIST_SIZES),
+        "Jackets": (["Jacket", "Bomber Jacket", "Parka", "Overshirt"], (70, 320), APPAREL_SIZES),
+        "Sweaters": (["Sweater", "Cardigan", "Hoodie", "Quarter Zip"], (35, 140), APPAREL_SIZES),
+        "Shorts": (["Shorts", "Chino Shorts", "Swim Shorts"], (20, 60), WAIST_SIZES),
+    },
+    "Women": {
+        "Dresses": (["Dress", "Midi Dress", "Wrap Dress", "Maxi Dress"], (35, 180), APPAREL_SIZES),
+        "Tops": (["Blouse", "Tank Top", "Bodysuit", "Camisole"], (15, 70), APPAREL_SIZES),
+        "Pants": (["Trousers", "Wide Leg Pants", "Leggings", "Cargo Pants"], (30, 110), APPAREL_SIZES),
+        "Skirts": (["Skirt", "Pleated Skirt", "Mini Skirt"], (25, 90), APPAREL_SIZES),
+        "Jackets": (["Blazer", "Trench Coat", "Puffer Jacket", "Denim Jacket"], (60, 350), APPAREL_SIZES),
+        "Knitwear": (["Jumper", "Cardigan", "Turtleneck"], (35, 160), APPAREL_SIZES),
+    },
+    "Kids": {
+        "T-Shirts": (["T-Shirt", "Graphic Tee"], (8, 25), KIDS_SIZES),
+        "Pants": (["Joggers", "Jeans", "Dungarees"], (15, 40), KIDS_SIZES),
+        "Outerwear": (["Raincoat", "Puffer Jacket", "Fleece"], (25, 90), KIDS_SIZES),
+    },
+    "Accessories": {
+        "Shoes": (["Sneaker", "Loafer", "Chelsea Boot", "Sandal"], (35, 220), SHOE_SIZES),
+        "Belts": (["Belt", "Reversible Belt", "Braided Belt"], (15, 70), ["S", "M", "L", "XL"]),
+        "Bags": (["Tote Bag", "Backpack", "Crossbody Bag", "Weekender"], (25, 260), ONE_SIZE),
+        "Hats": (["Cap", "Beanie", "Bucket Hat"], (12, 45), ONE_SIZE),
+        "Scarves": (["Scarf", "Bandana", "Wrap"], (15, 80), ONE_SIZE),
+    },
+}
+STYLES = ["Classic", "Slim Fit", "Relaxed", "Vintage", "Essential", "Premium", "Oversized",
+          "Cropped", "Lightweight", "Heavyweight", "Everyday", "Tailored", "Washed", "Organic"]
+COLORS = ["White", "Black", "Navy", "Olive", "Beige", "Grey", "Red", "Burgundy", "Charcoal",
+          "Sky Blue", "Camel", "Forest Green", "Cream", "Rust"]
+MATERIALS = ["Cotton", "Linen", "Denim", "Leather", "Wool", "Cashmere", "Canvas", "Silk",
+             "Suede", "Fleece", "Corduroy", "Jersey"]
+OCCASIONS = ["work", "weekends", "travel", "evenings out", "the gym", "layering", "summer", "cold days"]
+
+def generate_products(count, seed=42, start=1):
+    """
+    Yields `count` synthetic products without holding them in memory.
+    The same seed always produces the same catalog, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    categories = list(CATALOG.items())
+    now = datetime.utcnow()
+    for number in range(start, start + count):
+        category, subcategories = rng.choice(categories)
+        subcategory, (nouns, (low, high), size_run) = rng.choice(list(subcategories.items()))
+        noun, style, color, material = rng.choice(nouns), rng.choice(STYLES), rng.choice(COLORS), rng.choice(MATERIALS)
+
+        # Prices cluster towards the low end of the range, like real catalogs.
+        price = low + (high - low) * rng.betavariate(2, 5)
+        price = round(price) - (0.01 if rng.random() < 0.6 else 0)
+
+        roll = rng.random()
+        if roll < 0.08:
+            stock = 0
+        elif roll < 0.9:
+            stock = int(rng.expovariate(1 / 40)) + 1
+        else:
+            stock = rng.randint(200, 2000)
+
+        first = rng.randrange(len(size_run))
+        sizes = size_run[first:first + rng.randint(1, len(size_run))]
+        sku = f"GEN-{number:08d}"
+
+        yield {
+            "name": f"{style} {color} {material} {noun}",
+            "sku": sku,
+            "category": category,
+            "subcategory": subcategory,
+            "price": max(price, 1.0),
+            "stock": stock,
+            "description": f"{style} {material.lower()} {noun.lower()} in {color.lower()}, made for {rng.choice(OCCASIONS)}.",
+            "sizes": sizes,
+            "image_url": f"https://picsum.photos/seed/{sku}/600/800",
+            "created_at": now,
+        }
+
+def read_ndjson(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def read_csv(path):
+    """Rows need at least name, category and price; sizes are separated by '|' or ';'."""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            doc = {key: value for key, value in row.items() if key and value not in (None, "")}
+            if "price" in doc:
+                doc["price"] = float(doc["price"])
+            doc["stock"] = int(doc.get("stock", 0))
+            if "sizes" in doc:
+                doc["sizes"] = [s.strip() for s in doc["sizes"].replace(";", "|").split("|") if s.strip()]
+            yield doc
+
+def read_file(path):
+    if path.lower().endswith(".csv"):
+        return read_csv(path)
+    return read_ndjson(path)
+
+def to_write(doc, now):
+    doc["category_key"] = normalize_category(doc.get("category"))
+    created_at = doc.pop("created_at", None) or now
+    doc["updated_at"] = now
+    if not doc.get("sku"):
+        doc["created_at"] = created_at
+        return InsertOne(doc)
+    return UpdateOne({"sku": doc["sku"]}, {"$set": doc, "$setOnInsert": {"created_at": created_at}}, upsert=True)
+
+def bulk_load(collection, documents, batch_size=1000, report_every=100000):
+    """
+    Streams documents into the collection with unordered bulk writes.
+    Documents with a sku are upserted on it, so reloading a file updates
+    products in place instead of duplicating them.
+    """
+    stats = {"written": 0, "upserted": 0, "modified": 0, "errors": 0}
+    start = time.perf_counter()
+    next_report = report_every
+    batch = []
+
+    def flush():
+        try:
+            result = collection.bulk_write(batch, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            stats["errors"] += len(details.get("writeErrors", []))
+            if stats["errors"] == len(details.get("writeErrors", [])):
+                print(f"Bulk write error (further errors are only counted): {details['writeErrors'][0].get('errmsg')}")
+        stats["upserted"] += details.get("nUpserted", 0) + details.get("nInserted", 0)
+        stats["modified"] += details.get("nModified", 0)
+        stats["written"] += len(batch)
+        batch.clear()
+
+    now = datetime.utcnow()
+    for doc in documents:
+        batch.append(to_write(doc, now))
+        if len(batch) >= batch_size:
+            flush()
+            if stats["written"] >= next_report:
+                elapsed = time.perf_counter() - start
+                print(f"  {stats['written']:>12,} docs  {stats['written'] / elapsed:>10,.0f} docs/s")
+                next_report += report_every
+    if batch:
+        flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    return stats
+
+def seed_inventory(build_indexes=True, count=0, files=(), batch_size=1000, append=False, seed=42):
     print("Seeding inventory...")
     collection = db["inventory"]
     
@@ -18,6 +186,7 @@ def seed_inventory():
         # Men
         {
             "name": "Classic White T-Shirt",
+            "sku": "SM-000001",
             "category": "Men",
             "subcategory": "T-Shirts",
             "price": 25.00,
@@ -29,6 +198,7 @@ def seed_inventory():
         },
         {
             "name": "Slim Fit Denim Jeans",
+            "sku": "SM-000002",
             "category": "Men",
             "subcategory": "Jeans",
             "price": 65.00,
@@ -40,6 +210,7 @@ def seed_inventory():
         },
         {
             "name": "Leather Jacket",
+            "sku": "SM-000003",
             "category": "Men",
             "subcategory": "Jackets",
             "price": 150.00,
@@ -52,6 +223,7 @@ def seed_inventory():
         # Women
         {
             "name": "Floral Summer Dress",
+            "sku": "SM-000004",
             "category": "Women",
             "subcategory": "Dresses",
             "price": 45.00,
@@ -63,6 +235,7 @@ def seed_inventory():
         },
         {
             "name": "High-Waist Trousers",
+            "sku": "SM-000005",
             "category": "Women",
             "subcategory": "Pants",
             "price": 55.00,
@@ -75,6 +248,7 @@ def seed_inventory():
         # Accessories
         {
             "name": "Unisex Canvas Sneaker",
+            "sku": "SM-000006",
             "category": "Accessories",
             "subcategory": "Shoes",
             "price": 40.00,
@@ -86,6 +260,7 @@ def seed_inventory():
         },
         {
             "name": "Leather Belt",
+            "sku": "SM-000007",
             "category": "Accessories",
             "subcategory": "Belts",
             "price": 20.00,
@@ -97,16 +272,64 @@ def seed_inventory():
         }
     ]
 
-    # Clear existing inventory to avoid duplicates if re-run (optional, or just insert)
-    # collection.delete_many({}) 
-    # For safe seeding, let's just insert new ones or check existence. 
-    # Usually seeding implies fresh start or careful addition. I'll drop and recreate for "dummy" data request.
-    
-    collection.delete_many({})
-    print("Cleared existing inventory.")
-    
-    result = collection.insert_many(items)
-    print(f"Inserted {len(result.inserted_ids)} items into inventory.")
+    if not append:
+        if count or files:
+            # Much faster than delete_many at scale; indexes are rebuilt after the load.
+            collection.drop()
+        else:
+            collection.delete_many({})
+        print("Cleared existing inventory.")
+
+        for item in items:
+            item["category_key"] = normalize_category(item["category"])
+            item["updated_at"] = item["created_at"]
+
+        result = collection.insert_many(items)
+        print(f"Inserted {len(result.inserted_ids)} items into inventory.")
+
+    sources = [(path, read_file(path)) for path in files]
+    if count:
+        sources.append((f"{count:,} generated products", generate_products(count, seed)))
+
+    inventory_service = InventoryService()
+    if append:
+        # Kept documents may predate category_key/updated_at; loaded ones get them in to_write().
+        inventory_service.backfill_fields()
+    if sources:
+        # Upserts look products up by sku; every other index waits until the data is in.
+        inventory_service.ensure_sku_index()
+    for label, documents in sources:
+        print(f"Loading {label} in batches of {batch_size}...")
+        stats = bulk_load(collection, documents, batch_size)
+        print(
+            f"Loaded {stats['written']:,} docs in {stats['seconds']:.1f}s "
+            f"({stats['written'] / max(stats['seconds'], 1e-9):,.0f} docs/s): "
+            f"{stats['upserted']:,} new, {stats['modified']:,} updated, {stats['errors']:,} errors."
+        )
+
+    if build_indexes:
+        start = time.perf_counter()
+        inventory_service.ensure_indexes()
+        print(f"Inventory indexes are up to date ({time.perf_counter() - start:.1f}s).")
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed the inventory with sample, generated or file-based products.")
+    parser.add_argument("--count", type=int, default=0, help="synthetic products to generate on top of the samples")
+    parser.add_argument("--file", action="append", default=[], help="NDJSON or CSV file to load (repeatable)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="operations per bulk_write")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for generated products")
+    parser.add_argument("--append", action="store_true", help="keep existing inventory and skip the samples")
+    parser.add_argument("--no-indexes", action="store_true", help="skip building indexes after the load")
+    args = parser.parse_args()
+
+    seed_inventory(
+        build_indexes=not args.no_indexes,
+        count=args.count,
+        files=args.file,
+        batch_size=args.batch_size,
+        append=args.append,
+        seed=args.seed,
+    )
 
 if __name__ == "__main__":
-    seed_inventory()
+    main()
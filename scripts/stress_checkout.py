@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+from bson import ObjectId
+from concurrent.futures import ThreadPoolExecutor
+
+# Add agent directory to sys.path to allow imports
+sys.path.append(os.path.join(os.getcwd()))
+
+from config.db import db
+from features.inventory.service import InventoryService
+from features.orders.service import OrderService
+
+STRESS_USER = "stress_test_user"
+
+def buy(order_service, product_id, quantity):
+    start = time.perf_counter()
+    try:
+        order_service.place_order(STRESS_USER, product_id, quantity)
+        ok = True
+    except ValueError:
+        ok = False
+    return ok, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Many concurrent buyers of one SKU; verifies there is no oversell.")
+    parser.add_argument("--stock", type=int, default=200)
+    parser.add_argument("--buyers", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--quantity", type=int, default=1)
+    args = parser.parse_args()
+
+    inventory = db["inventory"]
+    now = datetime.utcnow()
+    product_id = str(inventory.insert_one({
+        "name": "Stress Test Tee",
+        "category": "Men",
+        "category_key": "men",
+        "subcategory": "T-Shirts",
+        "price": 10.0,
+        "stock": args.stock,
+        "created_at": now,
+        "updated_at": now,
+    }).inserted_id)
+
+    inventory_service = InventoryService()
+    order_service = OrderService(inventory_service)
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(lambda _: buy(order_service, product_id, args.quantity), range(args.buyers)))
+        elapsed = time.perf_counter() - start
+
+        sold = sum(args.quantity for ok, _ in results if ok)
+        final_stock = inventory_service.get_stock(product_id)
+        orders = db["orders"].count_documents({"user_id": STRESS_USER, "items.product_id": product_id})
+        latencies = sorted(latency for _, latency in results)
+
+        print(f"{args.buyers} buyers, {args.threads} threads, initial stock {args.stock}")
+        print(f"Sold {sold} units in {orders} orders, final stock {final_stock}")
+        print(f"Throughput {len(results) / elapsed:.0f} checkouts/s, "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.1f}ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms")
+
+        oversold = sold > args.stock or final_stock < 0 or sold + final_stock != args.stock
+        print("FAIL: stock was oversold or lost" if oversold else "OK: no oversell")
+        return 1 if oversold else 0
+    finally:
+        inventory.delete_one({"_id": ObjectId(product_id)})
+        db["orders"].delete_many({"user_id": STRESS_USER, "items.product_id": product_id})
+
+if __name__ == "__main__":
+    sys.exit(main())
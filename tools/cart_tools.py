@@ -0,0 +1,112 @@
+from langchain.tools import tool
+from langchain_core.runnables import RunnableConfig
+from core.container import services
+from tools.order_tools import resolve_product, session_of
+
+def format_cart(cart):
+    lines = []
+    for item in cart["items"]:
+        price = f"${item['price']:.2f}" if item["price"] is not None else "no longer available"
+        stock_note = "" if item["stock"] >= item["quantity"] else f" (only {item['stock']} in stock)"
+        lines.append(f"- {item['quantity']} x {item['name']} @ {price}{stock_note}")
+    lines.append(f"Total: ${cart['total']:.2f}")
+    return "\n".join(lines)
+
+@tool
+async def add_to_cart(product_name: str, quantity: int = 1, config: RunnableConfig = None):
+    """
+    Adds a product to the customer's cart. Use this instead of buy_product
+    when the customer wants several products, then call checkout_cart once.
+
+    Args:
+        product_name: The name or SKU of the product.
+        quantity: The number of items to add.
+
+    Returns:
+        The updated cart or an error message.
+    """
+    session_id = session_of(config)
+    if not session_id:
+        return "Error: No cart is available in this conversation."
+
+    product, error = await resolve_product(product_name)
+    if error:
+        return error
+    try:
+        await services.cart_service.add_item_async(session_id, product, quantity)
+    except ValueError as e:
+        return f"Error: Could not add '{product['name']}'. {e}"
+    cart = await services.cart_service.get_cart_async(session_id)
+    return f"Added {quantity} x {product['name']} to the cart.\n{format_cart(cart)}"
+
+@tool
+async def view_cart(config: RunnableConfig = None):
+    """
+    Shows the items in the customer's cart with current prices and the total.
+    """
+    session_id = session_of(config)
+    cart = await services.cart_service.get_cart_async(session_id) if session_id else None
+    if not cart or not cart["items"]:
+        return "The cart is empty."
+    return format_cart(cart)
+
+@tool
+async def remove_from_cart(product_name: str, config: RunnableConfig = None):
+    """
+    Removes a product from the customer's cart.
+
+    Args:
+        product_name: The name or SKU of the product to remove.
+    """
+    session_id = session_of(config)
+    if not session_id:
+        return "Error: No cart is available in this conversation."
+
+    product, error = await resolve_product(product_name)
+    if error:
+        return error
+    if not await services.cart_service.remove_item_async(session_id, product["_id"]):
+        return f"'{product['name']}' is not in the cart."
+    cart = await services.cart_service.get_cart_async(session_id)
+    return f"Removed {product['name']}.\n{format_cart(cart)}" if cart["items"] else f"Removed {product['name']}. The cart is now empty."
+
+@tool
+async def checkout_cart(user_email: str = None, config: RunnableConfig = None):
+    """
+    Buys everything in the customer's cart as a single order.
+
+    Args:
+        user_email: The email address to send the receipt to.
+
+    Returns:
+        A confirmation message with order details or an error message.
+    """
+    session_id = session_of(config)
+    cart = await services.cart_service.get_cart_async(session_id) if session_id else None
+    if not cart or not cart["items"]:
+        return "Error: The cart is empty."
+
+    user_id = user_email if user_email else "guest_user"
+    items = [{"product_id": item["product_id"], "name": item["name"], "quantity": item["quantity"]} for item in cart["items"]]
+    try:
+        order = await services.order_service.checkout_async(user_id, items)
+    except ValueError as e:
+        return f"Error: Could not check out. {e}"
+    await services.cart_service.clear_async(session_id)
+
+    if user_email:
+        await services.email_queue.enqueue_order_confirmation_async(user_email, order)
+        email_msg = f"Confirmation email will be sent to {user_email}."
+    else:
+        email_msg = "No email provided for notification."
+
+    items_text = "\n".join(f"- {item['quantity']} x {item['name']} @ ${item['price']:.2f}" for item in order["items"])
+    return (
+        f"✅ Payment Successful!\n"
+        f"Order Placed: #{order['order_id']}\n"
+        f"{items_text}\n"
+        f"Total: ${order['total_amount']}\n"
+        f"Payment ID: {order['payment_id']}\n"
+        f"{email_msg}\n"
+        f"Thank you for shopping with SalesMate!"
+    )
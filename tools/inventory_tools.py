@@ -1,11 +1,10 @@
-
 from langchain.tools import tool
-from features.inventory.service import InventoryService
-
-inventory_service = InventoryService()
+from core.container import services
+from features.inventory.serializers import compact_products
+from core.media import remember_products
 
 @tool
-def search_inventory(query: str = None, category: str = None, min_price: float = None, max_price: float = None):
+async def search_inventory(query: str = None, category: str = None, min_price: float = None, max_price: float = None):
     """
     Searches the product inventory for items matching the criteria.
     Use this tool when the user asks about available products, stock, or specific items.
@@ -17,9 +16,50 @@ def search_inventory(query: str = None, category: str = None, min_price: float =
         max_price: Maximum price filter.
         
     Returns:
-        A list of products matching the criteria.
+        A compact table of matching products, one per line.
     """
-    results = inventory_service.search_products(query, category, min_price, max_price)
+    search_cache = services.search_cache
+    key = search_cache.make_key(query=query, category=category, min_price=min_price, max_price=max_price)
+    results = await search_cache.aget(key)
+    if results is None:
+        results = await services.inventory_service.search_products_async(query, category, min_price, max_price)
+        await search_cache.aset(key, results)
+
     if not results:
         return "No products found matching the criteria."
-    return str(results)
+    # The bot sends photos for the products the reply mentions.
+    remember_products(results)
+    return compact_products(results)
+
+def format_facets(facets):
+    def counts(values):
+        return ", ".join(f"{value} {total}/{available}" for value, total, available in values)
+
+    lines = [f"{facets['scope']}: {facets['products']} products, {facets['in_stock']} in stock (counts below are total/in stock)"]
+    for label, key in (("categories", "categories"), ("subcategories", "subcategories"), ("sizes", "sizes"), ("prices", "price_ranges")):
+        if facets[key]:
+            lines.append(f"{label}: {counts(facets[key])}")
+    return "\n".join(lines)
+
+@tool
+async def browse_catalog(category: str = None, subcategory: str = None):
+    """
+    Summarizes what the store carries: product counts per category (or per
+    subcategory within a category), per size and per price range, with how
+    many are in stock. Use this for browsing questions such as "what
+    categories do you have?", "which sizes do you carry in men's?" or "what
+    price range are your jackets?" instead of calling search_inventory
+    several times.
+
+    Args:
+        category: Narrow the summary to a main category (e.g., "Men", "Women").
+        subcategory: Narrow it to a subcategory (e.g., "Jackets"), within the category if one is given.
+
+    Returns:
+        Facet counts as a few short lines.
+    """
+    facets = await services.facet_index.summary_async(category, subcategory)
+    if facets is None:
+        target = " / ".join(filter(None, [category, subcategory]))
+        return f"No products found in '{target}'. Call browse_catalog without arguments to see the categories."
+    return format_facets(facets)
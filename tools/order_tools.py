@@ -1,23 +1,49 @@
 
 from langchain.tools import tool
-from features.orders.service import OrderService
-from features.notifications.service import EmailService
-from features.inventory.service import InventoryService
-from features.users.service import AuthService
-import time
-import asyncio
+from langchain_core.runnables import RunnableConfig
+from core.container import services
+from datetime import datetime, timedelta
+import os
 
-order_service = OrderService()
-email_service = EmailService()
-inventory_service = InventoryService()
+RESOLVER_MIN_SCORE = float(os.getenv("RESOLVER_MIN_SCORE", 0.45))
+# Candidates within this score of the best one are treated as a tie.
+RESOLVER_AMBIGUITY_MARGIN = float(os.getenv("RESOLVER_AMBIGUITY_MARGIN", 0.05))
+
+ORDER_HISTORY_PAGE_SIZE = int(os.getenv("ORDER_HISTORY_PAGE_SIZE", 5))
+
+def session_of(config: RunnableConfig):
+    return (config or {}).get("configurable", {}).get("session_id")
+
+def describe_candidate(product):
+    return f"- {product['name']} (SKU {product['sku']})" if product.get("sku") else f"- {product['name']}"
+
+async def resolve_product(product_name: str):
+    """
+    Returns (product, None) when product_name clearly identifies one
+    product, or (None, message) explaining what the agent should do.
+    """
+    candidates = await services.product_resolver.resolve_async(product_name)
+    if not candidates or candidates[0][0] < RESOLVER_MIN_SCORE:
+        return None, f"Error: Product '{product_name}' not found."
+
+    best_score, product = candidates[0]
+    margin = 0 if best_score >= 1.0 else RESOLVER_AMBIGUITY_MARGIN
+    close = [candidate for score, candidate in candidates if best_score - score <= margin]
+    if len(close) > 1:
+        options = "\n".join(describe_candidate(candidate) for candidate in close)
+        return None, (
+            f"'{product_name}' matches several products:\n{options}\n"
+            f"Ask the customer which one they want, then try again with its exact name or SKU."
+        )
+    return product, None
 
 @tool
-def buy_product(product_name: str, quantity: int = 1, user_email: str = None):
+async def buy_product(product_name: str, quantity: int = 1, user_email: str = None):
     """
     Processes a product purchase.
     
     Args:
-        product_name: The name of the product to buy.
+        product_name: The name or SKU of the product to buy.
         quantity: The number of items to purchase.
         user_email: The email address to send the receipt to. If not provided, it will ask or use a default.
     
@@ -25,32 +51,22 @@ def buy_product(product_name: str, quantity: int = 1, user_email: str = None):
         A confirmation message with order details or an error message.
     """
     
-    products = inventory_service.search_products(query=product_name, limit=1)
-    if not products:
-        return f"Error: Product '{product_name}' not found."
-    
-    product = products[0]
-    
-    if product.get('stock', 0) < quantity:
-        return f"Error: Insufficient stock for '{product['name']}'. Available: {product.get('stock', 0)}"
+    product, error = await resolve_product(product_name)
+    if error:
+        return error
 
-    price = product.get('price', 0)
-    total_amount = price * quantity
-    
     user_id = user_email if user_email else "guest_user"
-    
-    items = [{
-        "name": product["name"],
-        "quantity": quantity,
-        "price": price,
-        "image_url": product.get("image_url")
-    }]
-    
-    order = order_service.create_order(user_id, items, total_amount)
+
+    try:
+        order = await services.order_service.place_order_async(user_id, product["_id"], quantity)
+    except ValueError as e:
+        return f"Error: Could not buy '{product['name']}'. {e}"
+
+    total_amount = order["total_amount"]
     
     if user_email:
-        email_service.send_order_confirmation(user_email, order)
-        email_msg = f"Confirmation email sent to {user_email}."
+        await services.email_queue.enqueue_order_confirmation_async(user_email, order)
+        email_msg = f"Confirmation email will be sent to {user_email}."
     else:
         email_msg = "No email provided for notification."
 
@@ -62,3 +78,41 @@ def buy_product(product_name: str, quantity: int = 1, user_email: str = None):
         f"{email_msg}\n"
         f"Thank you for shopping with SalesMate!"
     )
+
+def format_order(order):
+    items = ", ".join(f"{item['quantity']} x {item['name']}" for item in order.get("items", []))
+    return f"- {order['created_at']:%Y-%m-%d} #{order['order_id']} ({order['status']}): {items}. Total ${order['total_amount']:.2f}"
+
+@tool
+async def get_order_history(days: int = None, cursor: str = None, config: RunnableConfig = None):
+    """
+    Lists the logged-in customer's past orders, newest first.
+
+    Args:
+        days: Only show orders from the last this many days, e.g. 7 for "last week".
+        cursor: The cursor returned with the previous page, to see older orders.
+
+    Returns:
+        A page of orders, with a cursor for the next page if there are more.
+    """
+    # Sessions are keyed by Telegram chat id, which is what accounts are linked to at /login.
+    session_id = session_of(config)
+    chat_id = int(session_id) if session_id and session_id.lstrip("-").isdigit() else None
+    user = await services.auth_service.get_user_by_telegram_id_async(chat_id) if chat_id is not None else None
+    if not user:
+        return "Error: The customer is not logged in. Ask them to use /login <email> <password> to see their orders."
+
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    try:
+        orders, next_cursor = await services.order_service.get_order_history_async(
+            user["email"], ORDER_HISTORY_PAGE_SIZE, cursor, since
+        )
+    except ValueError as e:
+        return f"Error: {e}"
+
+    if not orders:
+        return "No more orders." if cursor else "The customer has no orders in this period."
+    lines = [format_order(order) for order in orders]
+    if next_cursor:
+        lines.append(f"More orders are available; call again with cursor='{next_cursor}'.")
+    return "\n".join(lines)